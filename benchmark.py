@@ -0,0 +1,197 @@
+import argparse
+import csv
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from library_data import LibraryData, FIELDNAMES, SORT_KEYS
+
+GENRES = [
+    'Fiction', 'Fantasy', 'Science Fiction', 'Classics', 'Mystery', 'Thriller',
+    'Romance', 'Historical Fiction', 'Nonfiction', 'History', 'Biography',
+    'Philosophy', 'Horror', 'Young Adult', 'Poetry', 'Science', 'Psychology',
+    'Literary Fiction', 'Adventure', 'Humor', 'Memoir', 'Dystopia', 'Crime'
+]
+
+WORDS = (
+    'the a of and to in his her world story young old city war love night house '
+    'secret journey family time life death king queen river dark light last first '
+    'stranger letter island empire garden winter summer memory dream shadow voice '
+    'discovers must between before after against never forgotten hidden lost'
+).split()
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+
+def _sentence(rng, min_words, max_words):
+    """Random capitalized run of words"""
+    words = [rng.choice(WORDS) for _ in range(rng.randint(min_words, max_words))]
+    return " ".join(words).capitalize()
+
+def generate_book(rng, index, start_date=datetime(2020, 1, 1)):
+    """Build one realistic looking library row"""
+    genres = rng.sample(GENRES, rng.randint(1, 4)) + [None] * 3
+    added = start_date + timedelta(minutes=index * 7 + rng.randint(0, 6))
+    title = f"{_sentence(rng, 1, 5)} {index}"  # Index keeps titles unique
+    return {
+        'Title': title,
+        'Author': f"{rng.choice(WORDS).capitalize()} {rng.choice(WORDS).capitalize()}son",
+        'Year': rng.randint(1800, 2024),
+        'Pages': rng.randint(80, 1200),
+        'Rating': round(rng.uniform(2.5, 4.9), 2),
+        'Genre1': genres[0],
+        'Genre2': genres[1],
+        'Genre3': genres[2],
+        'Genre4': genres[3],
+        'Description': ". ".join(_sentence(rng, 8, 20) for _ in range(rng.randint(3, 10))) + ".",
+        'Image_URL': f"https://images.example.com/covers/{index}._SX1200_.jpg",
+        'Local_Image_Path': os.path.join("book_covers", f"{title}.jpg"),
+        'Date_Added': added.isoformat(),
+        'Last_Modified': added.isoformat(),
+        'Read': rng.random() < 0.4,
+        'Goodreads_URL': f"https://www.goodreads.com/book/show/{100000 + index}"
+    }
+
+def generate_library(csv_file, rows, seed=0):
+    """Write a synthetic library_data.csv with the given number of rows"""
+    rng = random.Random(seed)
+    with open(csv_file, 'w', newline='', encoding='utf-8') as file:
+        writer = csv.DictWriter(file, fieldnames=FIELDNAMES)
+        writer.writeheader()
+        for index in range(rows):
+            writer.writerow(generate_book(rng, index))
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[rank]
+
+def measure(operation, iterations, setup=None):
+    """Time operation() iterations times, then trace one more call for peak memory.
+
+    setup(i) runs before each call outside the timed region and its
+    return value is passed to operation.
+    """
+    latencies = []
+    for i in range(iterations):
+        argument = setup(i) if setup else None
+        start = time.perf_counter()
+        operation(argument)
+        latencies.append(time.perf_counter() - start)
+
+    argument = setup(iterations) if setup else None  # Tracing skews timings, keep it separate
+    tracemalloc.start()
+    operation(argument)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    total = sum(latencies)
+    return {
+        'iterations': iterations,
+        'throughput_ops_per_s': iterations / total if total else None,
+        'mean_ms': total / iterations * 1000,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p95_ms': percentile(latencies, 95) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+        'max_ms': max(latencies) * 1000,
+        'peak_memory_bytes': peak
+    }
+
+def benchmark_size(rows, iterations, seed=0):
+    """Run every data-layer benchmark against a fresh library of rows books"""
+    results = {}
+    workdir = tempfile.mkdtemp(prefix='library_bench_')
+    try:
+        csv_file = os.path.join(workdir, 'library_data.csv')
+        generate_library(csv_file, rows, seed)
+        library = LibraryData(csv_file)
+        rng = random.Random(seed + 1)
+        titles = [book['Title'] for book in library.get_all_books()]
+
+        results['get_all_books'] = measure(lambda _: library.get_all_books(), iterations)
+
+        books = library.get_all_books()
+        for key, sort_key in SORT_KEYS.items():
+            results[f'sort_{key}'] = measure(lambda _: sorted(books, key=sort_key), iterations)
+
+        results['add_book'] = measure(
+            lambda book: library.add_book(book), iterations,
+            setup=lambda i: generate_book(rng, rows + i))
+
+        results['update_book'] = measure(
+            lambda title: library.update_book(title, {'Read': True, 'Rating': 4.2}), iterations,
+            setup=lambda i: rng.choice(titles))
+
+        removable = rng.sample(titles, min(iterations + 1, len(titles)))
+        results['remove_book'] = measure(
+            lambda title: library.remove_book(title), len(removable) - 1,
+            setup=lambda i: removable[i])
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+def current_commit():
+    """Short git hash of the working tree, or None outside a repository"""
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def print_report(report):
+    """Print a compact table of the results"""
+    for rows, operations in report['results'].items():
+        print(f"\n{rows} books")
+        print(f"  {'operation':<18}{'ops/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'peak MB':>10}")
+        for name, stats in operations.items():
+            print(f"  {name:<18}{stats['throughput_ops_per_s']:>10.1f}{stats['p50_ms']:>10.2f}"
+                  f"{stats['p95_ms']:>10.2f}{stats['p99_ms']:>10.2f}"
+                  f"{stats['peak_memory_bytes'] / 1e6:>10.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the library data layer")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                        help="library sizes to generate (default: 1000 10000 100000)")
+    parser.add_argument('--iterations', type=int, default=10, help="timed runs per operation")
+    parser.add_argument('--seed', type=int, default=0, help="random seed for the generator")
+    parser.add_argument('--output', default=None, help="JSON results file (default: benchmark_<commit>.json)")
+    parser.add_argument('--generate', metavar='CSV', help="only write a synthetic library to CSV and exit")
+    args = parser.parse_args()
+
+    if args.generate:
+        generate_library(args.generate, args.sizes[0], args.seed)
+        print(f"Wrote {args.sizes[0]} books to {args.generate}")
+        return
+
+    commit = current_commit()
+    report = {
+        'commit': commit,
+        'timestamp': datetime.now().isoformat(),
+        'python': sys.version.split()[0],
+        'platform': sys.platform,
+        'seed': args.seed,
+        'iterations': args.iterations,
+        'results': {}
+    }
+    for rows in args.sizes:
+        print(f"Benchmarking {rows} books...")
+        report['results'][str(rows)] = benchmark_size(rows, args.iterations, args.seed)
+
+    print_report(report)
+    output = args.output or f"benchmark_{commit or 'local'}.json"
+    with open(output, 'w', encoding='utf-8') as file:
+        json.dump(report, file, indent=2)
+    print(f"\nResults saved to {output}")
+
+if __name__ == "__main__":
+    main()
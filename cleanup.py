@@ -1,13 +1,28 @@
+import argparse
+import json
 import os
 import shutil
+import time
+
+from library_data import LibraryData, write_json
+
+MANIFEST_FILE = '.maintenance_manifest.json'
+REFRESH_STATE_FILE = 'refresh_state.json'
+TEMP_PREFIX = '.tmp_'  # Left behind if a library commit was interrupted
+TEMP_MAX_AGE = 3600  # Seconds before a temp file is considered abandoned
 
 def cleanup_files():
     """Clean up all generated files"""
     files_to_remove = [
         'library_data.csv',
+        'library_data.csv.gen',
+        'library_data.csv.lock',
+        'refresh_state.json',
+        '.sync_state.json',
+        MANIFEST_FILE,
         'book_covers'
     ]
-    
+
     for item in files_to_remove:
         try:
             if os.path.isfile(item):  # Remove file
@@ -19,5 +34,221 @@ def cleanup_files():
         except Exception as e:
             print(f"Error removing {item}: {str(e)}")
 
+def _load_manifest():
+    """Index from the previous maintenance run, empty if missing or corrupt"""
+    try:
+        with open(MANIFEST_FILE, 'r', encoding='utf-8') as file:
+            manifest = json.load(file)
+    except (OSError, ValueError):
+        manifest = {}
+    manifest.setdefault('dirs', {})
+    return manifest
+
+def _save_manifest(manifest):
+    """Overwrite the manifest in place.
+
+    Replacing it would change its directory's mtime and force a rescan on
+    the next run; a torn write only costs one full scan.
+    """
+    with open(MANIFEST_FILE, 'w', encoding='utf-8') as file:
+        json.dump(manifest, file)
+
+def _scan_directory(directory, manifest, stats):
+    """Return {name: [size, mtime]} for the files in directory.
+
+    Adding or removing a file changes the directory's mtime, so when it
+    matches the manifest the previous listing is reused without a walk.
+    """
+    try:
+        directory_mtime = os.stat(directory).st_mtime
+    except FileNotFoundError:
+        return {}
+    cached = manifest['dirs'].get(directory)
+    if cached and cached['mtime'] == directory_mtime:
+        stats['scans_skipped'] += 1
+        return cached['files']
+
+    stats['scans'] += 1
+    files = {}
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.is_file():
+                info = entry.stat()
+                files[entry.name] = [info.st_size, info.st_mtime]
+    manifest['dirs'][directory] = {'mtime': directory_mtime, 'files': files}
+    return files
+
+def _forget(directory, names, manifest):
+    """Drop deleted files from the cached listing and record the new directory mtime"""
+    cached = manifest['dirs'].get(directory)
+    if not cached:
+        return
+    for name in names:
+        cached['files'].pop(name, None)
+    try:
+        cached['mtime'] = os.stat(directory).st_mtime
+    except FileNotFoundError:
+        manifest['dirs'].pop(directory, None)
+
+def _remove(directory, names, files, stats, dry_run):
+    """Delete files by name, counting bytes freed"""
+    removed = []
+    for name in names:
+        path = os.path.join(directory, name)
+        try:
+            if not dry_run:
+                os.remove(path)
+            removed.append(name)
+            stats['removed'] += 1
+            stats['bytes_freed'] += files[name][0]
+            print(f"Removed file: {path}")
+        except FileNotFoundError:
+            removed.append(name)
+        except Exception as e:
+            print(f"Error removing {path}: {str(e)}")
+    return removed
+
+def _library_index(library, image_folder, manifest):
+    """Covers and Goodreads URLs referenced by the library, cached per generation"""
+    generation = library.generation
+    csv_mtime = os.stat(library.csv_file).st_mtime if os.path.exists(library.csv_file) else 0
+    cached = manifest.get('library')
+    if cached and cached['generation'] == generation and cached['csv_mtime'] == csv_mtime:
+        return cached, True
+
+    folder = os.path.normcase(os.path.abspath(image_folder))
+    covers = {}  # Cover file name -> [title, can be downloaded again]
+    urls = []
+    for book in library.get_all_books():
+        path = book.get('Local_Image_Path')
+        if path and path != 'None':
+            path = os.path.normcase(os.path.abspath(path))
+            if os.path.dirname(path) == folder:
+                image_url = book.get('Image_URL')
+                covers[os.path.basename(path)] = [book['Title'], bool(image_url and image_url != 'None')]
+        if book.get('Goodreads_URL'):
+            urls.append(book['Goodreads_URL'])
+
+    index = {'generation': generation, 'csv_mtime': csv_mtime, 'covers': covers, 'urls': urls}
+    manifest['library'] = index
+    return index, False
+
+def _enforce_budget(directory, files, budget, candidates, stats, dry_run):
+    """Delete the oldest candidate files until directory fits in budget bytes"""
+    total = sum(size for size, _ in files.values())
+    if budget is None or total <= budget:
+        return []
+    evict = []
+    for name in sorted(candidates, key=lambda name: files[name][1]):  # Oldest first
+        if total <= budget:
+            break
+        evict.append(name)
+        total -= files[name][0]
+    if total > budget:
+        print(f"Warning: {directory} is still over budget ({total} > {budget} bytes)")
+    return _remove(directory, evict, files, stats, dry_run)
+
+def _compact_library(library, stats, dry_run):
+    """Collapse duplicate titles left by old unsynchronized writes, keeping the newest"""
+    def mutate(books):
+        newest = {}
+        for book in books:
+            kept = newest.get(book['Title'])
+            if kept is None or (book['Last_Modified'] or '') >= (kept['Last_Modified'] or ''):
+                newest[book['Title']] = book
+        stats['duplicates'] += len(books) - len(newest)
+        if len(newest) == len(books) or dry_run:
+            return False
+        books[:] = [book for book in books if newest[book['Title']] is book]
+        return True
+
+    library.commit(mutate)
+
+def _compact_refresh_state(urls, stats, dry_run):
+    """Drop metadata refresh entries for books no longer in the library"""
+    try:
+        with open(REFRESH_STATE_FILE, 'r', encoding='utf-8') as file:
+            state = json.load(file)
+    except (OSError, ValueError):
+        return
+    keep = set(urls)
+    stale = [url for url in state if url not in keep]
+    stats['refresh_entries_dropped'] += len(stale)
+    if stale and not dry_run:
+        for url in stale:
+            del state[url]
+        write_json(REFRESH_STATE_FILE, state)
+
+def maintain_storage(csv_file='library_data.csv', image_folder='book_covers', image_budget=None,
+                     cache_budgets=None, full=False, dry_run=False):
+    """Remove unreachable covers, enforce byte budgets and compact data files.
+
+    cache_budgets maps extra cache directories to byte budgets; their
+    oldest files are evicted first. Unless full is set, unchanged
+    directories and an unchanged library are served from the manifest.
+    Returns a dict of counters.
+    """
+    stats = {'scans': 0, 'scans_skipped': 0, 'removed': 0, 'bytes_freed': 0,
+             'covers_evicted': 0, 'duplicates': 0, 'refresh_entries_dropped': 0}
+    manifest = {'dirs': {}} if full else _load_manifest()
+    library = LibraryData(csv_file)
+
+    index, library_unchanged = _library_index(library, image_folder, manifest)
+    if not library_unchanged:  # Only recheck data files when the library moved on
+        _compact_library(library, stats, dry_run)
+        _compact_refresh_state(index['urls'], stats, dry_run)
+
+    covers = _scan_directory(image_folder, manifest, stats)  # Reachability from library records
+    orphans = [name for name in covers if name not in index['covers']]
+    removed = _remove(image_folder, orphans, covers, stats, dry_run)
+
+    remaining = {name: info for name, info in covers.items() if name not in removed}  # Budget what is left
+    downloadable = [name for name in remaining if index['covers'].get(name, [None, False])[1]]
+    evicted = _enforce_budget(image_folder, remaining, image_budget, downloadable, stats, dry_run)  # Fetched again on display
+    stats['covers_evicted'] = len(evicted)
+    if not dry_run:
+        _forget(image_folder, removed + evicted, manifest)
+
+    for directory, budget in (cache_budgets or {}).items():
+        files = _scan_directory(directory, manifest, stats)
+        evicted = _enforce_budget(directory, files, budget, list(files), stats, dry_run)
+        if not dry_run:
+            _forget(directory, evicted, manifest)
+
+    data_directory = os.path.dirname(os.path.abspath(csv_file))
+    now = time.time()
+    data_files = _scan_directory(data_directory, manifest, stats)
+    abandoned = [name for name, (_, mtime) in data_files.items()
+                 if name.startswith(TEMP_PREFIX) and now - mtime > TEMP_MAX_AGE]
+    removed = _remove(data_directory, abandoned, data_files, stats, dry_run)
+    if not dry_run:
+        _forget(data_directory, removed, manifest)
+        if stats['duplicates']:  # Our own commit changed the library
+            manifest.pop('library', None)
+        _save_manifest(manifest)
+    return stats
+
+def _megabytes(value):
+    return int(float(value) * 1024 * 1024)
+
 if __name__ == "__main__":
-    cleanup_files()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Wipe or maintain library storage")
+    parser.add_argument('--maintain', action='store_true',
+                        help="remove orphaned covers, enforce budgets and compact data instead of wiping")
+    parser.add_argument('--image-budget', type=_megabytes, help="maximum size of book_covers in MB")
+    parser.add_argument('--cache', nargs=2, action='append', metavar=('DIR', 'MB'), default=[],
+                        help="cache directory and its budget in MB, may be repeated")
+    parser.add_argument('--full', action='store_true', help="ignore the manifest and rescan everything")
+    parser.add_argument('--dry-run', action='store_true', help="report what would be removed")
+    args = parser.parse_args()
+
+    if args.maintain:
+        result = maintain_storage(
+            image_budget=args.image_budget,
+            cache_budgets={directory: _megabytes(mb) for directory, mb in args.cache},
+            full=args.full,
+            dry_run=args.dry_run
+        )
+        print(", ".join(f"{key}: {value}" for key, value in result.items()))
+    else:
+        cleanup_files()
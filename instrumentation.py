@@ -0,0 +1,166 @@
+import functools
+import json
+import logging
+import os
+import random
+import threading
+import time
+
+MAX_SAMPLES = 2048  # Per-operation reservoir size, keeps memory bounded
+
+_enabled = os.environ.get('LIBRARY_PROFILE', '') not in ('', '0')
+_stats = {}
+_stats_lock = threading.Lock()
+
+class _NoopSpan:
+    """Shared do-nothing context manager returned while disabled"""
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NOOP = _NoopSpan()
+
+class _Span:
+    """Times a with-block and records it under name"""
+    __slots__ = ('name', 'start')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        record(self.name, time.perf_counter() - self.start)
+        return False
+
+class _Histogram:
+    """Count, total and a reservoir sample of durations for one operation"""
+    __slots__ = ('count', 'total', 'max', 'samples')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples = []
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        if len(self.samples) < MAX_SAMPLES:
+            self.samples.append(seconds)
+        else:  # Reservoir sampling keeps percentiles representative
+            slot = random.randrange(self.count)
+            if slot < MAX_SAMPLES:
+                self.samples[slot] = seconds
+
+    def percentile(self, pct):
+        ordered = sorted(self.samples)
+        rank = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered))) - 1))
+        return ordered[rank]
+
+def enable(on=True):
+    """Turn timing collection on or off at runtime"""
+    global _enabled
+    _enabled = on
+
+def is_enabled():
+    return _enabled
+
+def reset():
+    """Drop all collected timings"""
+    with _stats_lock:
+        _stats.clear()
+
+def record(name, seconds):
+    """Add one duration to the histogram for name"""
+    with _stats_lock:
+        histogram = _stats.get(name)
+        if histogram is None:
+            histogram = _stats[name] = _Histogram()
+        histogram.add(seconds)
+
+def span(name):
+    """Context manager timing a block, near free while disabled"""
+    return _Span(name) if _enabled else _NOOP
+
+def timed(name):
+    """Decorator timing every call of a function under name"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record(name, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+def snapshot():
+    """Return {name: {count, total_ms, p50_ms, p95_ms, max_ms}} for every operation"""
+    with _stats_lock:
+        return {
+            name: {
+                'count': histogram.count,
+                'total_ms': histogram.total * 1000,
+                'p50_ms': histogram.percentile(50) * 1000,
+                'p95_ms': histogram.percentile(95) * 1000,
+                'max_ms': histogram.max * 1000
+            }
+            for name, histogram in sorted(_stats.items())
+        }
+
+def report():
+    """Text table of per-stage timings, slowest total first"""
+    rows = sorted(snapshot().items(), key=lambda item: item[1]['total_ms'], reverse=True)
+    if not rows:
+        return "No timings recorded" + ("" if _enabled else " (set LIBRARY_PROFILE=1 to enable)")
+    lines = [f"{'stage':<28}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}{'total ms':>11}"]
+    for name, stats in rows:
+        lines.append(f"{name:<28}{stats['count']:>8}{stats['p50_ms']:>10.2f}{stats['p95_ms']:>10.2f}"
+                     f"{stats['max_ms']:>10.2f}{stats['total_ms']:>11.1f}")
+    return "\n".join(lines)
+
+_RESERVED = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime'}
+
+class StructuredFormatter(logging.Formatter):
+    """Render log records as JSON lines including any extra= fields"""
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage()
+        }
+        entry.update({key: value for key, value in vars(record).items() if key not in _RESERVED})
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+class PlainFormatter(logging.Formatter):
+    """Human readable log lines with any extra= fields appended as key=value"""
+    def formatMessage(self, record):
+        line = super().formatMessage(record)
+        extras = [f"{key}={value!r}" for key, value in vars(record).items() if key not in _RESERVED]
+        return f"{line} [{' '.join(extras)}]" if extras else line
+
+def configure_logging(level=None, structured=None):
+    """Set up root logging from arguments or LIBRARY_LOG_LEVEL / LIBRARY_LOG_JSON"""
+    level = level or os.environ.get('LIBRARY_LOG_LEVEL', 'WARNING')
+    if structured is None:
+        structured = os.environ.get('LIBRARY_LOG_JSON', '') not in ('', '0')
+    handler = logging.StreamHandler()
+    if structured:
+        handler.setFormatter(StructuredFormatter())
+    else:
+        handler.setFormatter(PlainFormatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    root.setLevel(level)
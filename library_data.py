@@ -1,91 +1,279 @@
 import csv
+import json
+import logging
 import os
+import tempfile
+import time
+from contextlib import contextmanager
 from datetime import datetime
+from instrumentation import timed
+
+try:  # Platform specific file locking
+    import msvcrt
+except ImportError:
+    msvcrt = None
+    import fcntl
+
+logger = logging.getLogger(__name__)
+
+FIELDNAMES = [  # Define all fields for CSV structure
+    'Title', 'Author', 'Year', 'Pages', 'Rating',
+    'Genre1', 'Genre2', 'Genre3', 'Genre4',
+    'Description', 'Image_URL', 'Local_Image_Path',
+    'Date_Added', 'Last_Modified', 'Read', 'Goodreads_URL'
+]
+GENRE_FIELDS = ['Genre1', 'Genre2', 'Genre3', 'Genre4']
+
+SORT_KEYS = {  # Sort keys used by the library view
+    'title': lambda x: x['Title'].lower() if x['Title'] else '',
+    'author': lambda x: x['Author'].lower() if x['Author'] else '',
+    'year': lambda x: int(x['Year']) if x['Year'] else 0,
+    'rating': lambda x: float(x['Rating']) if x['Rating'] else 0.0,
+    'date_added': lambda x: x['Date_Added'] if x['Date_Added'] else '',
+    'read': lambda x: (x.get('Read', False), x['Title'].lower())
+}
+
+def replace_file(path, write):
+    """Write a file next to path and atomically swap it in.
+
+    If write returns False the new file is discarded and False returned.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.tmp_', suffix=os.path.basename(path))
+    try:
+        with os.fdopen(fd, 'w', newline='', encoding='utf-8') as file:
+            keep = write(file) is not False
+            file.flush()
+            os.fsync(file.fileno())
+        if not keep:
+            os.remove(temp_path)
+            return False
+        for attempt in range(50):  # Windows refuses while a reader has the file open
+            try:
+                os.replace(temp_path, path)
+                break
+            except PermissionError:
+                if attempt == 49:
+                    raise
+                time.sleep(0.02)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return True
+
+def write_json(path, data):
+    """Atomically replace path with data serialized as JSON"""
+    replace_file(path, lambda file: json.dump(data, file))
+
+class LibraryConflictError(Exception):
+    """Raised when the library file changed since the caller's snapshot"""
+    pass
 
 class LibraryData:
     def __init__(self, csv_file="library_data.csv"):
         self.csv_file = csv_file
-        self.fieldnames = [  # Define all fields for CSV structure
-            'Title', 'Author', 'Year', 'Pages', 'Rating', 
-            'Genre1', 'Genre2', 'Genre3', 'Genre4',
-            'Description', 'Image_URL', 'Local_Image_Path',
-            'Date_Added', 'Last_Modified', 'Read', 'Goodreads_URL'
-        ]
+        self.lock_file = csv_file + ".lock"  # Held while a writer commits
+        self.generation_file = csv_file + ".gen"  # Bumped on every commit
+        self.fieldnames = list(FIELDNAMES)
         self._ensure_csv_exists()  # Create CSV if it doesn't exist
-    
+
     def _ensure_csv_exists(self):
         """Create CSV file with headers if it doesn't exist"""
         if not os.path.exists(self.csv_file):
-            with open(self.csv_file, 'w', newline='', encoding='utf-8') as file:
+            with self._locked():
+                if not os.path.exists(self.csv_file):  # Another process may have created it
+                    self._write_books([])
+
+    @contextmanager
+    def _locked(self):
+        """Hold an exclusive lock on the library across processes"""
+        with open(self.lock_file, 'a+') as handle:
+            if msvcrt:
+                handle.seek(0)
+                while True:  # LK_LOCK gives up after ~10 seconds, keep waiting
+                    try:
+                        msvcrt.locking(handle.fileno(), msvcrt.LK_LOCK, 1)
+                        break
+                    except OSError:
+                        continue
+            else:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if msvcrt:
+                    handle.seek(0)
+                    msvcrt.locking(handle.fileno(), msvcrt.LK_UNLCK, 1)
+                else:
+                    fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+
+    @property
+    def generation(self):
+        """Number of commits made to the library file"""
+        try:
+            with open(self.generation_file, 'r', encoding='utf-8') as file:
+                return int(file.read().strip() or 0)
+        except (OSError, ValueError):
+            return 0
+
+    @timed('csv.write')
+    def _write_books(self, books):
+        """Replace the CSV contents, readers see either the old or new file"""
+        def write(file):
+            writer = csv.DictWriter(file, fieldnames=self.fieldnames)
+            writer.writeheader()
+            writer.writerows(books)
+        replace_file(self.csv_file, write)
+
+    @timed('csv.commit')
+    def commit(self, mutate, expected_generation=None):
+        """Apply mutate(books) under the lock, writing if it returns truthy.
+
+        Raises LibraryConflictError if expected_generation is stale.
+        """
+        with self._locked():
+            current = self.generation
+            if expected_generation is not None and current != expected_generation:
+                raise LibraryConflictError(
+                    f"Library changed (generation {expected_generation} -> {current})")
+            books = self.get_all_books()
+            result = mutate(books)
+            if result:
+                self._write_books(books)
+                replace_file(self.generation_file, lambda file: file.write(str(current + 1)))
+        return result
+
+    @timed('csv.rewrite')
+    def rewrite(self, transform, expected_generation=None):
+        """Stream the library through transform(books, changes) under the lock.
+
+        Like commit, but transform gets an iterator over the stored books
+        and returns an iterable of the books to write, so only the rows in
+        flight are held in memory. transform counts what it does in
+        changes; nothing is written if every count stays zero.
+        Returns the changes dict.
+        """
+        changes = {'added': 0, 'modified': 0, 'removed': 0}
+        with self._locked():
+            current = self.generation
+            if expected_generation is not None and current != expected_generation:
+                raise LibraryConflictError(
+                    f"Library changed (generation {expected_generation} -> {current})")
+
+            def write(file):
                 writer = csv.DictWriter(file, fieldnames=self.fieldnames)
                 writer.writeheader()
-    
-    def add_book(self, book_data): # Add a new book to the CSV file
-        existing_books = self.get_all_books()
-        if any(book['Title'] == book_data['Title'] for book in existing_books):
-            print(f"Book '{book_data['Title']}' already exists in library")
-            return False
-        
-        print(f"Adding book: {book_data['Title']}")  # Debug print
-        book_data['Date_Added'] = datetime.now().isoformat()
-        book_data['Last_Modified'] = book_data['Date_Added']
-        
-        for field in self.fieldnames:  # Ensure all fields exist
-            if field not in book_data:
-                book_data[field] = None
-        
-        with open(self.csv_file, 'a', newline='', encoding='utf-8') as file:
-            writer = csv.DictWriter(file, fieldnames=self.fieldnames)
-            writer.writerow(book_data)
-        
-        print(f"Successfully added: {book_data['Title']}")  # Debug print
-        return True
-    
+                writer.writerows(transform(self.iter_books(), changes))
+                return any(changes.values())
+
+            if replace_file(self.csv_file, write):
+                replace_file(self.generation_file, lambda file: file.write(str(current + 1)))
+        return changes
+
+    def add_book(self, book_data, expected_generation=None): # Add a new book to the CSV file
+        def mutate(existing_books):
+            if any(book['Title'] == book_data['Title'] for book in existing_books):
+                logger.info("Book '%s' already exists in library", book_data['Title'])
+                return False
+
+            logger.debug("Adding book", extra={'title': book_data['Title']})
+            book_data['Date_Added'] = datetime.now().isoformat()
+            book_data['Last_Modified'] = book_data['Date_Added']
+
+            for field in self.fieldnames:  # Ensure all fields exist
+                if field not in book_data:
+                    book_data[field] = None
+
+            row = {field: book_data[field] for field in self.fieldnames}
+            existing_books.append(row)
+            return True
+
+        if self.commit(mutate, expected_generation):
+            logger.info("Added book", extra={'title': book_data['Title']})
+            return True
+        return False
+
     def get_all_books(self):
+        return self.get_snapshot()[1]
+
+    @timed('csv.load')
+    def get_snapshot(self):
+        """Return (generation, books) without waiting for writers.
+
+        The generation is read before the file, so it never claims to be
+        newer than the books it comes with.
+        """
+        generation = self.generation
+        return generation, list(self.iter_books())
+
+    def iter_books(self):
+        """Yield books one at a time straight from the CSV file"""
         if not os.path.exists(self.csv_file):
-            return []
-            
-        books = []
+            return
         with open(self.csv_file, 'r', encoding='utf-8') as file:
-            reader = csv.DictReader(file)
-            for row in reader:
-                row['Year'] = int(row['Year']) if row['Year'] else 0  # Convert numeric fields
-                row['Pages'] = int(row['Pages']) if row['Pages'] else 0
-                row['Rating'] = float(row['Rating']) if row['Rating'] else 0.0
-                row['Read'] = row['Read'].lower() == 'true' if row['Read'] else False  # Convert boolean field
-                books.append(row)
-        return books
-    
-    def update_book(self, title, updates):
+            for row in csv.DictReader(file):
+                yield self.parse_row(row)
+
+    @staticmethod
+    def parse_row(row):
+        """Convert a row of CSV strings to the types the application uses"""
+        row['Year'] = int(row['Year']) if row['Year'] else 0  # Convert numeric fields
+        row['Pages'] = int(row['Pages']) if row['Pages'] else 0
+        row['Rating'] = float(row['Rating']) if row['Rating'] else 0.0
+        row['Read'] = row['Read'].lower() == 'true' if row['Read'] else False  # Convert boolean field
+        return row
+
+    def diff_snapshots(self, old_books, new_books):
+        """Compare two book lists keyed by title.
+
+        Returns (added, modified, removed): lists of books for the first
+        two and a list of titles for the last.
+        """
+        old_by_title = {book['Title']: book for book in old_books}
+        new_by_title = {book['Title']: book for book in new_books}
+        added = [book for title, book in new_by_title.items() if title not in old_by_title]
+        modified = [book for title, book in new_by_title.items()
+                    if title in old_by_title and old_by_title[title] != book]
+        removed = [title for title in old_by_title if title not in new_by_title]
+        return added, modified, removed
+
+    def update_book(self, title, updates, expected_generation=None):
         """Update a book's information in the CSV file"""
-        books = self.get_all_books()
-        updated = False
-        
-        for book in books:
-            if book['Title'] == title:
-                book.update(updates)
-                book['Last_Modified'] = datetime.now().isoformat()  # Add timestamp
-                updated = True
-                break
-        
-        if updated:
-            with open(self.csv_file, 'w', newline='', encoding='utf-8') as file:
-                writer = csv.DictWriter(file, fieldnames=self.fieldnames)
-                writer.writeheader()
-                writer.writerows(books)
-        
-        return updated
-    
-    def remove_book(self, title):
+        def mutate(books):
+            for book in books:
+                if book['Title'] == title:
+                    book.update(updates)
+                    book['Last_Modified'] = datetime.now().isoformat()  # Add timestamp
+                    return True
+            return False
+
+        return self.commit(mutate, expected_generation)
+
+    def update_books(self, updates_by_title, expected_generation=None):
+        """Apply {title: updates} to several books in a single commit.
+
+        Titles no longer in the library are skipped. Returns the list of
+        titles that were updated.
+        """
+        def mutate(books):
+            updated = []
+            now = datetime.now().isoformat()
+            for book in books:
+                updates = updates_by_title.get(book['Title'])
+                if updates:
+                    book.update(updates)
+                    book['Last_Modified'] = now
+                    updated.append(book['Title'])
+            return updated
+
+        return self.commit(mutate, expected_generation) or []
+
+    def remove_book(self, title, expected_generation=None):
         """Remove a book from the CSV file"""
-        books = self.get_all_books()
-        original_length = len(books)
-        books = [book for book in books if book['Title'] != title]
-        
-        if len(books) < original_length:
-            with open(self.csv_file, 'w', newline='', encoding='utf-8') as file:
-                writer = csv.DictWriter(file, fieldnames=self.fieldnames)
-                writer.writeheader()
-                writer.writerows(books)
-            return True
-        return False
\ No newline at end of file
+        def mutate(books):
+            original_length = len(books)
+            books[:] = [book for book in books if book['Title'] != title]
+            return len(books) < original_length
+
+        return self.commit(mutate, expected_generation)
@@ -0,0 +1,209 @@
+import threading
+
+import numpy as np
+
+from library_data import GENRE_FIELDS
+
+RATING_BINS = 10  # Half-star buckets from 0 to 5
+MAX_YEAR = 2100
+GENRE_PAIRS = [(a, b) for a in range(4) for b in range(a + 1, 4)]  # Column pairs for co-occurrence
+
+def _number(value, kind):
+    """Parse CSV or scraper values, treating blanks and junk as zero"""
+    try:
+        return kind(value) if value not in (None, '', 'None') else kind(0)
+    except (TypeError, ValueError):
+        return kind(0)
+
+def _flag(value):
+    return value is True or str(value).lower() == 'true'
+
+class LibraryStats:
+    """Columnar copy of the library with aggregates kept up to date per change.
+
+    Rows live in preallocated NumPy columns; removing a book moves the
+    last row into its slot. Every aggregate is adjusted by +1/-1 for the
+    rows that change, so the dashboard never rescans the whole library.
+    """
+    def __init__(self, books=(), capacity=1024):
+        self.lock = threading.Lock()
+        self.size = 0
+        self.rows = {}  # Title -> row index
+        self.titles = []  # Row index -> title
+        self.rating = np.zeros(capacity, dtype=np.float32)
+        self.year = np.zeros(capacity, dtype=np.int32)
+        self.pages = np.zeros(capacity, dtype=np.int64)
+        self.read = np.zeros(capacity, dtype=bool)
+        self.author = np.zeros(capacity, dtype=np.int32)
+        self.genres = np.full((capacity, 4), -1, dtype=np.int32)  # -1 means no genre
+
+        self.author_ids = {}
+        self.author_names = []
+        self.genre_ids = {}
+        self.genre_names = []
+
+        self.rating_hist = np.zeros(RATING_BINS, dtype=np.int64)
+        self.decade_hist = np.zeros(MAX_YEAR // 10 + 1, dtype=np.int64)  # Bucket 0 holds unknown years
+        self.author_counts = np.zeros(0, dtype=np.int64)
+        self.cooccurrence = np.zeros((0, 0), dtype=np.int64)  # Diagonal holds per-genre counts
+        self.pages_by_read = np.zeros(2, dtype=np.int64)  # [unread, read]
+        self.books_by_read = np.zeros(2, dtype=np.int64)
+        self.rating_total = 0.0  # Sum and count of rated books for the average
+        self.rated_books = 0
+
+        self._load(list(books))
+
+    def _intern(self, name, ids, names):
+        """Map a string to a dense integer id"""
+        if name in ids:
+            return ids[name]
+        ids[name] = len(names)
+        names.append(name)
+        return ids[name]
+
+    def _grow(self, needed):
+        """Make room for needed rows and for newly interned authors/genres"""
+        capacity = len(self.rating)
+        if needed > capacity:
+            new_capacity = max(needed, capacity * 2)
+            for name in ('rating', 'year', 'pages', 'read', 'author'):
+                column = getattr(self, name)
+                grown = np.zeros(new_capacity, dtype=column.dtype)
+                grown[:capacity] = column
+                setattr(self, name, grown)
+            genres = np.full((new_capacity, 4), -1, dtype=np.int32)
+            genres[:capacity] = self.genres
+            self.genres = genres
+
+        if len(self.author_counts) < len(self.author_names):
+            counts = np.zeros(max(len(self.author_names), 2 * len(self.author_counts)), dtype=np.int64)
+            counts[:len(self.author_counts)] = self.author_counts
+            self.author_counts = counts
+        if len(self.cooccurrence) < len(self.genre_names):
+            size = max(len(self.genre_names), 2 * len(self.cooccurrence))
+            matrix = np.zeros((size, size), dtype=np.int64)
+            old = len(self.cooccurrence)
+            matrix[:old, :old] = self.cooccurrence
+            self.cooccurrence = matrix
+
+    def _store(self, row, book):
+        """Write one book's values into the columns at row"""
+        self.rating[row] = _number(book.get('Rating'), float)
+        self.year[row] = _number(book.get('Year'), int)
+        self.pages[row] = _number(book.get('Pages'), int)
+        self.read[row] = _flag(book.get('Read'))
+        self.author[row] = self._intern(book.get('Author') or 'Unknown Author', self.author_ids, self.author_names)
+        genres = []
+        for field in GENRE_FIELDS:
+            genre = book.get(field)
+            if genre and genre != 'None' and genre not in genres:
+                genres.append(genre)
+        self.genres[row] = [self._intern(g, self.genre_ids, self.genre_names) for g in genres] + [-1] * (4 - len(genres))
+
+    def _accumulate(self, rows, sign):
+        """Add (sign=1) or subtract (sign=-1) the given rows from every aggregate"""
+        if len(rows) == 0:
+            return
+        rating_bins = np.clip((self.rating[rows] * 2).astype(np.int64), 0, RATING_BINS - 1)
+        np.add.at(self.rating_hist, rating_bins, sign)
+        decades = np.clip(self.year[rows], 0, MAX_YEAR) // 10
+        np.add.at(self.decade_hist, decades, sign)
+        np.add.at(self.author_counts, self.author[rows], sign)
+
+        ratings = self.rating[rows]
+        self.rating_total += sign * float(ratings[ratings > 0].sum())
+        self.rated_books += sign * int(np.count_nonzero(ratings > 0))
+
+        read = self.read[rows].astype(np.int64)
+        np.add.at(self.pages_by_read, read, sign * self.pages[rows])
+        np.add.at(self.books_by_read, read, sign)
+
+        genres = self.genres[rows]
+        present = genres[genres >= 0]
+        np.add.at(self.cooccurrence, (present, present), sign)
+        for a, b in GENRE_PAIRS:
+            both = (genres[:, a] >= 0) & (genres[:, b] >= 0)
+            first, second = genres[both, a], genres[both, b]
+            np.add.at(self.cooccurrence, (first, second), sign)
+            np.add.at(self.cooccurrence, (second, first), sign)
+
+    def _load(self, books):
+        """Bulk build used once when the dashboard is created"""
+        with self.lock:
+            self._grow(len(books))
+            for book in books:
+                if book['Title'] in self.rows:
+                    continue
+                row = self.size
+                self._store(row, book)
+                self.rows[book['Title']] = row
+                self.titles.append(book['Title'])
+                self.size += 1
+            self._grow(self.size)
+            self._accumulate(np.arange(self.size), 1)
+
+    def _remove_row(self, title):
+        row = self.rows.pop(title)
+        self._accumulate(np.array([row]), -1)
+        last = self.size - 1
+        if row != last:  # Move the last row into the hole
+            for column in (self.rating, self.year, self.pages, self.read, self.author, self.genres):
+                column[row] = column[last]
+            self.titles[row] = self.titles[last]
+            self.rows[self.titles[row]] = row
+        self.titles.pop()
+        self.genres[last] = -1
+        self.size -= 1
+
+    def apply_changes(self, added, modified, removed):
+        """Fold a commit into the aggregates; safe to apply the same change twice"""
+        with self.lock:
+            for title in removed:
+                if title in self.rows:
+                    self._remove_row(title)
+            for book in list(added) + list(modified):
+                if book['Title'] in self.rows:  # Replace the old values
+                    self._remove_row(book['Title'])
+                row = self.size
+                self._grow(row + 1)
+                self._store(row, book)
+                self._grow(row + 1)  # Room for any author or genre just interned
+                self.rows[book['Title']] = row
+                self.titles.append(book['Title'])
+                self.size += 1
+                self._accumulate(np.array([row]), 1)
+
+    def summary(self, top=10):
+        """Plain Python view of the aggregates for the dashboard"""
+        with self.lock:
+            rating_hist = [(i / 2, (i + 1) / 2, int(count)) for i, count in enumerate(self.rating_hist)]
+            decades = np.nonzero(self.decade_hist)[0]
+            decade_hist = [(int(d) * 10, int(self.decade_hist[d])) for d in decades]
+
+            counts = self.author_counts[:len(self.author_names)]
+            top_authors = np.argsort(-counts, kind='stable')[:top]
+            authors = [(self.author_names[i], int(counts[i])) for i in top_authors if counts[i] > 0]
+
+            size = len(self.genre_names)
+            matrix = self.cooccurrence[:size, :size]
+            genre_counts = np.diag(matrix)
+            top_genres = [(self.genre_names[i], int(genre_counts[i]))
+                          for i in np.argsort(-genre_counts, kind='stable')[:top] if genre_counts[i] > 0]
+            upper = np.triu(matrix, k=1)
+            flat = np.argsort(-upper, axis=None, kind='stable')[:top]
+            pairs = [(self.genre_names[i], self.genre_names[j], int(upper[i, j]))
+                     for i, j in zip(*np.unravel_index(flat, upper.shape)) if upper[i, j] > 0]
+
+            return {
+                'books': self.size,
+                'average_rating': self.rating_total / self.rated_books if self.rated_books else 0.0,
+                'rating_histogram': rating_hist,
+                'decade_histogram': decade_hist,
+                'books_read': int(self.books_by_read[1]),
+                'books_unread': int(self.books_by_read[0]),
+                'pages_read': int(self.pages_by_read[1]),
+                'pages_unread': int(self.pages_by_read[0]),
+                'top_authors': authors,
+                'top_genres': top_genres,
+                'genre_pairs': pairs
+            }
@@ -0,0 +1,312 @@
+import argparse
+import bz2
+import gzip
+import hashlib
+import json
+import logging
+import lzma
+import os
+import shutil
+
+from instrumentation import timed
+from library_data import FIELDNAMES, LibraryData, write_json
+
+logger = logging.getLogger(__name__)
+
+LIBRARY_FILE = 'library_data.csv'
+IMAGE_FOLDER = 'book_covers'
+SYNC_STATE_FILE = '.sync_state.json'
+IMPORT_BATCH = 20000  # Export records held in memory per pass over the library during import
+COMPRESSORS = {  # Export/import format chosen by file extension, plain JSON Lines otherwise
+    '.gz': gzip.open,
+    '.bz2': bz2.open,
+    '.xz': lzma.open
+}
+UNHASHED_FIELDS = ('Local_Image_Path', 'Date_Added', 'Last_Modified')  # Machine specific or bookkeeping
+
+def _open(path, mode, opener_path=None):
+    opener = COMPRESSORS.get(os.path.splitext(opener_path or path)[1].lower(), open)
+    return opener(path, mode + 't', encoding='utf-8')
+
+def _text(value):
+    """Value as it would be written to the CSV file"""
+    return '' if value is None else str(value)
+
+def content_hash(book):
+    """Hash of the fields a user or scraper can change, stable across machines"""
+    digest = hashlib.sha1()
+    for field in FIELDNAMES:
+        if field not in UNHASHED_FIELDS:
+            digest.update(_text(book.get(field)).encode('utf-8'))
+            digest.update(b'\x1f')
+    return digest.hexdigest()
+
+def _cover_path(directory, book):
+    """Absolute path of a book's cover, or None if it has no cover on disk"""
+    path = book.get('Local_Image_Path')
+    if not path or path == 'None':
+        return None
+    path = os.path.join(directory, path)  # Stored relative to the library directory
+    return path if os.path.isfile(path) else None
+
+@timed('sync.export')
+def export_library(csv_file, path):
+    """Stream every book to a JSON Lines file, one record per line.
+
+    The file is compressed when path ends in .gz, .bz2 or .xz. Books are
+    read and written one at a time. Returns the number exported.
+    """
+    library = LibraryData(csv_file)
+    temp_path = path + '.part'
+    count = 0
+    try:
+        with _open(temp_path, 'w', opener_path=path) as file:
+            for book in library.iter_books():
+                file.write(json.dumps(book, ensure_ascii=False) + '\n')
+                count += 1
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    logger.info("Exported library", extra={'books': count, 'path': path})
+    return count
+
+def read_export(path):
+    """Yield library rows from an export file, skipping malformed lines"""
+    with _open(path, 'r') as file:
+        for line_number, line in enumerate(file, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                logger.warning("Skipping malformed line %d of %s", line_number, path)
+                continue
+            if not isinstance(record, dict) or not record.get('Title'):
+                continue
+            row = {field: record.get(field) for field in FIELDNAMES}
+            for field in ('Year', 'Pages', 'Rating', 'Read'):  # parse_row expects CSV strings
+                row[field] = _text(row[field])
+            yield LibraryData.parse_row(row)
+
+def _newer(row, current):
+    return (row['Last_Modified'] or '') > (current['Last_Modified'] or '')
+
+def _batches(records, size):
+    """Group records into {title: row} dicts of up to size titles, newest duplicate wins"""
+    batch = {}
+    for row in records:
+        current = batch.get(row['Title'])
+        if current is None or _newer(row, current):
+            batch[row['Title']] = row
+        if len(batch) >= size:
+            yield batch
+            batch = {}
+    if batch:
+        yield batch
+
+def _merge(books, batch, directory, changes, stats):
+    """Stream books, swapping in newer batch records and appending new titles"""
+    for book in books:
+        row = batch.pop(book['Title'], None)
+        if row is not None:
+            if _newer(row, book) and content_hash(row) != content_hash(book):
+                row['Local_Image_Path'] = book['Local_Image_Path']  # Keep the local cover
+                book = row
+                changes['modified'] += 1
+                stats['updated'] += 1
+            else:
+                stats['skipped'] += 1
+        yield book
+    for row in batch.values():
+        if not _cover_path(directory, row):  # Exported from another machine
+            row['Local_Image_Path'] = ''
+        changes['added'] += 1
+        stats['added'] += 1
+        yield row
+
+@timed('sync.import')
+def import_library(csv_file, path, batch_size=IMPORT_BATCH):
+    """Merge an export file into the library without loading either whole.
+
+    Up to batch_size export records are held in memory; each batch is one
+    streaming pass over the library file under its lock, so memory does
+    not grow with the library. New titles are added with their original
+    dates; existing titles are replaced only by a newer, different record.
+    Returns a dict of counters.
+    """
+    library = LibraryData(csv_file)
+    directory = os.path.dirname(os.path.abspath(csv_file))  # Cover paths are relative to the library
+    stats = {'added': 0, 'updated': 0, 'skipped': 0}
+    for batch in _batches(read_export(path), batch_size):
+        library.rewrite(lambda books, changes: _merge(books, batch, directory, changes, stats))
+    logger.info("Imported library", extra=dict(stats, path=path))
+    return stats
+
+def _index(library, directory):
+    """Return (generation, {title: [last_modified, hash, has_cover]}) in one streaming pass"""
+    generation = library.generation  # Read before the file, like get_snapshot
+    index = {}
+    for book in library.iter_books():
+        index[book['Title']] = [book['Last_Modified'] or '', content_hash(book),
+                                _cover_path(directory, book) is not None]
+    return generation, index
+
+def _load_state(directory):
+    try:
+        with open(os.path.join(directory, SYNC_STATE_FILE), 'r', encoding='utf-8') as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+def _save_state(directory, peer, entry):
+    state = _load_state(directory)
+    state[peer] = entry
+    write_json(os.path.join(directory, SYNC_STATE_FILE), state)
+
+def _plan(source_index, target_index, base, full):
+    """Decide per title which side's record wins.
+
+    base holds the hashes both sides agreed on after the last sync, so a
+    title whose hash moved on only one side is copied (or deleted) from
+    that side. When both moved, or there is no base yet, the newer
+    Last_Modified wins and a deletion never beats an edit.
+    """
+    to_target, to_source, delete_on_target, delete_on_source = [], [], [], []
+    for title in source_index.keys() | target_index.keys():
+        source, target = source_index.get(title), target_index.get(title)
+        source_hash = source[1] if source else None
+        target_hash = target[1] if target else None
+        if source_hash == target_hash:
+            if full and source[2] != target[2]:  # Same record, cover only on one side
+                (to_target if source[2] else to_source).append(title)
+            continue
+
+        base_hash = base.get(title)
+        source_changed, target_changed = source_hash != base_hash, target_hash != base_hash
+        if source_changed and not target_changed:
+            (to_target if source else delete_on_target).append(title)
+        elif target_changed and not source_changed:
+            (to_source if target else delete_on_source).append(title)
+        elif target is None or (source is not None and source[0] >= target[0]):
+            to_target.append(title)
+        else:
+            to_source.append(title)
+    return to_target, to_source, delete_on_target, delete_on_source
+
+def _copy_covers(rows, source_dir, target_dir, stats):
+    """Copy covers missing or different at the target and point rows at the copies"""
+    for row in rows:
+        source_path = _cover_path(source_dir, row)
+        if source_path is None:
+            row['Local_Image_Path'] = ''
+            continue
+        relative = os.path.join(IMAGE_FOLDER, os.path.basename(source_path))
+        target_path = os.path.join(target_dir, relative)
+        if not os.path.isfile(target_path) or os.path.getsize(target_path) != os.path.getsize(source_path):
+            os.makedirs(os.path.dirname(target_path), exist_ok=True)
+            shutil.copy2(source_path, target_path)
+            stats['covers_copied'] += 1
+        row['Local_Image_Path'] = relative
+
+def _apply(library, generation, rows, removed):
+    """Write rows and removals to a library in one commit, failing if it changed meanwhile"""
+    def mutate(books):
+        positions = {book['Title']: i for i, book in enumerate(books)}
+        for row in rows:
+            position = positions.get(row['Title'])
+            if position is None:
+                books.append(row)
+                continue
+            if not row['Local_Image_Path']:  # Keep a cover the other side lacks
+                row['Local_Image_Path'] = books[position]['Local_Image_Path']
+            books[position] = row
+        if removed:
+            books[:] = [book for book in books if book['Title'] not in removed]
+        return rows or removed
+
+    return bool(library.commit(mutate, expected_generation=generation))
+
+@timed('sync.libraries')
+def sync_libraries(source_dir, target_dir, full=False):
+    """Two-way sync of two library directories, transferring only changed records.
+
+    Each directory holds a library_data.csv and its book_covers folder.
+    If neither library has committed since the last sync nothing is read.
+    Otherwise both are indexed by content hash, only the winning records
+    are loaded and written across, and their covers are copied when the
+    other side lacks them. full also copies covers missing for records
+    that are otherwise identical. Raises LibraryConflictError if either
+    library changes during the sync; running it again is safe.
+    """
+    source = LibraryData(os.path.join(source_dir, LIBRARY_FILE))
+    target = LibraryData(os.path.join(target_dir, LIBRARY_FILE))
+    source_key, target_key = os.path.abspath(source_dir), os.path.abspath(target_dir)
+    stats = {'skipped': False, 'sent': 0, 'received': 0, 'deleted_on_target': 0,
+             'deleted_on_source': 0, 'covers_copied': 0}
+
+    previous = _load_state(source_dir).get(target_key)
+    if (previous and not full and previous['generation'] == source.generation
+            and previous['peer_generation'] == target.generation):
+        stats['skipped'] = True
+        return stats
+
+    source_generation, source_index = _index(source, source_dir)
+    target_generation, target_index = _index(target, target_dir)
+    base = previous['hashes'] if previous else {}
+    to_target, to_source, delete_on_target, delete_on_source = _plan(source_index, target_index, base, full)
+
+    wanted_from_source, wanted_from_target = set(to_target), set(to_source)
+    outgoing = [book for book in source.iter_books() if book['Title'] in wanted_from_source]
+    incoming = [book for book in target.iter_books() if book['Title'] in wanted_from_target]
+    _copy_covers(outgoing, source_dir, target_dir, stats)
+    _copy_covers(incoming, target_dir, source_dir, stats)
+
+    if _apply(target, target_generation, outgoing, set(delete_on_target)):
+        target_generation += 1
+    if _apply(source, source_generation, incoming, set(delete_on_source)):
+        source_generation += 1
+
+    hashes = {title: entry[1] for title, entry in source_index.items()}  # State both sides now share
+    for title in to_source:
+        hashes[title] = target_index[title][1]
+    for title in delete_on_source:
+        del hashes[title]
+    _save_state(source_dir, target_key, {'generation': source_generation,
+                                         'peer_generation': target_generation, 'hashes': hashes})
+    _save_state(target_dir, source_key, {'generation': target_generation,
+                                         'peer_generation': source_generation, 'hashes': hashes})
+
+    stats.update(sent=len(outgoing), received=len(incoming),
+                 deleted_on_target=len(delete_on_target), deleted_on_source=len(delete_on_source))
+    logger.info("Synced libraries", extra=dict(stats, source=source_key, target=target_key))
+    return stats
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export, import or sync libraries")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    export_parser = commands.add_parser('export', help="write the library as JSON Lines (.gz/.bz2/.xz to compress)")
+    export_parser.add_argument('path')
+    export_parser.add_argument('--library', default=LIBRARY_FILE)
+
+    import_parser = commands.add_parser('import', help="merge an export file into the library")
+    import_parser.add_argument('path')
+    import_parser.add_argument('--library', default=LIBRARY_FILE)
+    import_parser.add_argument('--batch', type=int, default=IMPORT_BATCH)
+
+    sync_parser = commands.add_parser('sync', help="two-way sync with another library directory")
+    sync_parser.add_argument('peer')
+    sync_parser.add_argument('--local', default='.')
+    sync_parser.add_argument('--full', action='store_true', help="also copy covers missing on either side")
+    args = parser.parse_args()
+
+    if args.command == 'export':
+        print(f"Exported {export_library(args.library, args.path)} books to {args.path}")
+    elif args.command == 'import':
+        result = import_library(args.library, args.path, args.batch)
+        print(", ".join(f"{key}: {value}" for key, value in result.items()))
+    else:
+        result = sync_libraries(args.local, args.peer, args.full)
+        print(", ".join(f"{key}: {value}" for key, value in result.items()))
@@ -1,6 +1,8 @@
 from modern_library_gui import ModernLibraryGUI
+import instrumentation
 
 def main():
+    instrumentation.configure_logging()  # LIBRARY_LOG_LEVEL / LIBRARY_LOG_JSON
     print("Starting Library Manager...")
     try:
         app = ModernLibraryGUI()
@@ -8,6 +10,9 @@ def main():
         app.run()
     except Exception as e:
         print(f"Error: {str(e)}")
+    finally:
+        if instrumentation.is_enabled():  # LIBRARY_PROFILE=1 prints timings on exit
+            print(instrumentation.report())
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -0,0 +1,173 @@
+import heapq
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import requests
+
+from library_data import GENRE_FIELDS, write_json
+from web_scraper import RateBudget
+
+logger = logging.getLogger(__name__)
+
+REFRESH_FIELDS = ['Rating', 'Pages', 'Description']  # Scraped fields that change over time
+RETRY_DELAY = 600  # Seconds before a failed book is tried again, doubled per failure
+NETWORK_ERRORS = (requests.ConnectionError, requests.Timeout)  # Retrying other books won't help
+
+class MetadataRefresher:
+    """Keep scraped ratings and genres up to date in the background"""
+    def __init__(self, library_data, scraper, state_file="refresh_state.json",
+                 requests_per_minute=20, batch_size=25, max_workers=3,
+                 max_age_days=30, is_busy=None):
+        self.library_data = library_data
+        self.scraper = scraper
+        self.state_file = state_file  # Per-URL validators and last check time
+        self.budget = RateBudget(requests_per_minute)  # Refresh share of the scraper's own budget
+        self.batch_size = batch_size
+        self.max_workers = max_workers
+        self.max_age = max_age_days * 86400
+        self.is_busy = is_busy or (lambda: False)  # GUI callback, refresh waits while True
+        self.stop_event = threading.Event()
+        self.network_down = threading.Event()  # Set when a fetch failed to reach Goodreads
+        self.thread = None
+        self.has_more = False  # Last batch was full, more stale books are waiting
+        self.state = self._load_state()
+        self.state_lock = threading.Lock()
+
+    def _load_state(self):
+        """Load refresh state, starting fresh if missing or corrupt"""
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_state(self):
+        """Write refresh state atomically"""
+        with self.state_lock:
+            state = dict(self.state)
+        write_json(self.state_file, state)
+
+    def _last_refreshed(self, book):
+        """Seconds since epoch when the book's metadata was last known fresh"""
+        stamps = [self.state.get(book['Goodreads_URL'], {}).get('checked', 0)]
+        for field in ('Last_Modified', 'Date_Added'):
+            try:
+                stamps.append(datetime.fromisoformat(book[field]).timestamp())
+                break
+            except (KeyError, TypeError, ValueError):
+                continue
+        return max(stamps)
+
+    def select_stale_books(self):
+        """Pick the books whose metadata is oldest, up to batch_size"""
+        now = time.time()
+        cutoff = now - self.max_age
+        candidates = []
+        for book in self.library_data.get_all_books():
+            url = book.get('Goodreads_URL')
+            if not url or url == 'None':
+                continue
+            if self.state.get(url, {}).get('retry_at', 0) > now:  # Failed recently, backing off
+                continue
+            refreshed = self._last_refreshed(book)
+            if refreshed < cutoff:
+                candidates.append((refreshed, book['Title'], book))
+        return [book for _, _, book in heapq.nsmallest(self.batch_size, candidates)]
+
+    def _changed_fields(self, book, fresh):
+        """Return only the refreshable fields that differ from the stored book"""
+        changes = {}
+        for field in REFRESH_FIELDS:
+            value = fresh.get(field)
+            if field == 'Rating' and not value:  # Missing on page, keep the old value
+                continue
+            if field == 'Pages' and not value:
+                continue
+            if field == 'Description' and value == "No description available":
+                continue
+            if str(value) != str(book.get(field)):
+                changes[field] = value
+
+        old_genres = {book.get(field) for field in GENRE_FIELDS} - {None, ''}
+        new_genres = [fresh.get(field) for field in GENRE_FIELDS]
+        if any(new_genres) and set(new_genres) - {None} != old_genres:  # Genre order is not stable
+            changes.update(zip(GENRE_FIELDS, new_genres))
+        return changes
+
+    def _refresh_book(self, book):
+        """Fetch one book under the rate budget, returns its changed fields"""
+        if self.stop_event.is_set() or self.network_down.is_set():  # Skip the rest of the batch
+            return {}
+        while self.is_busy() and not self.stop_event.is_set():  # Stay out of the way of the GUI
+            self.stop_event.wait(0.5)
+        if not self.budget.acquire(self.stop_event):
+            return {}
+
+        url = book['Goodreads_URL']
+        entry = self.state.get(url, {})
+        try:
+            fresh, validators = self.scraper.fetch_book_update(
+                url, entry.get('etag'), entry.get('last_modified'), self.stop_event)
+        except Exception as e:
+            if self.stop_event.is_set():  # Cut short by stop(), not a real failure
+                return {}
+            logger.warning("Error refreshing %s: %s", book['Title'], e)
+            failures = entry.get('failures', 0) + 1
+            delay = min(RETRY_DELAY * 2 ** (failures - 1), self.max_age)
+            with self.state_lock:  # Back off without marking the book fresh
+                self.state[url] = dict(entry, failures=failures, retry_at=time.time() + delay)
+            if isinstance(e, NETWORK_ERRORS):
+                self.network_down.set()
+            return {}
+
+        with self.state_lock:
+            self.state[url] = dict(validators, checked=time.time())
+        return self._changed_fields(book, fresh) if fresh else {}
+
+    def refresh_once(self):
+        """Refresh one batch of stale books, returns the updated titles"""
+        books = self.select_stale_books()
+        self.has_more = len(books) == self.batch_size
+        if not books:
+            return []
+
+        logger.info("Refreshing metadata", extra={'books': len(books)})
+        self.network_down.clear()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            results = list(executor.map(self._refresh_book, books))
+
+        updates = {book['Title']: changes for book, changes in zip(books, results) if changes}
+        updated = self.library_data.update_books(updates) if updates else []  # One commit per batch
+        self._save_state()
+        if self.network_down.is_set():  # Wait for the next interval instead of walking the library
+            self.has_more = False
+            logger.warning("Goodreads unreachable, metadata refresh paused")
+        logger.info("Metadata refresh finished", extra={'books': len(books), 'updated': len(updated)})
+        return updated
+
+    def start(self, interval=600):
+        """Refresh in a daemon thread every interval seconds until stopped"""
+        if self.thread and self.thread.is_alive():
+            return
+
+        def run():
+            while not self.stop_event.is_set():
+                try:
+                    self.refresh_once()
+                except Exception as e:
+                    logger.exception("Error in metadata refresh: %s", e)
+                self.stop_event.wait(0 if self.has_more else interval)  # The rate budget paces full batches
+
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=run, daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout=None):
+        """Stop the background thread, waiting up to timeout seconds for it to finish"""
+        self.stop_event.set()
+        if self.thread and timeout is not None:
+            self.thread.join(timeout)
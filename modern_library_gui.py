@@ -1,12 +1,25 @@
 import customtkinter as ctk
 from PIL import Image
-import requests
 from io import BytesIO
-from web_scraper import GoodreadsScraper, save_image
-from library_data import LibraryData
+from web_scraper import GoodreadsScraper, RateBudget, save_image
+from library_data import LibraryConflictError, LibraryData, SORT_KEYS
+from library_stats import LibraryStats
+from recommendations import SimilarBooks
+from metadata_refresh import MetadataRefresher
+from search_prefetch import SearchPrefetcher
+import instrumentation
+from instrumentation import span, timed
+from ui_scheduler import UIScheduler, INTERACTIVE, VISIBLE, BACKGROUND
 import os
 import threading
 import io
+import logging
+
+logger = logging.getLogger(__name__)
+
+VISIBLE_TILES = 3  # Library tiles that fit in the window before scrolling
+SEARCH_DEBOUNCE_MS = 400  # Pause in typing before Goodreads is queried
+GOODREADS_REQUESTS_PER_MINUTE = 60  # Searches, prefetch and metadata refresh combined
 
 class ModernLibraryGUI:
     def __init__(self):
@@ -16,7 +29,11 @@ class ModernLibraryGUI:
         ctk.set_appearance_mode("dark")
         
         self.load_custom_fonts()  # Load custom fonts for the application
-        self.scraper = GoodreadsScraper()
+        self.scheduler = UIScheduler(self.window)  # All deferred GUI work goes through here
+        self.scraper = GoodreadsScraper(rate_budget=RateBudget(GOODREADS_REQUESTS_PER_MINUTE, burst=5))
+        self.search_prefetcher = SearchPrefetcher(self.scraper)  # Memoized and prefetched searches
+        self.search_debounce = None
+        self.suggestions_frame = None
         self.library_data = LibraryData()
         
         self.main_container = ctk.CTkFrame(self.window, fg_color="transparent")  # Main container for all widgets
@@ -31,8 +48,30 @@ class ModernLibraryGUI:
         self.image_quality = 85  # JPEG compression quality (0-100)
         self.max_cache_size = 50  # Maximum number of images to keep in cache
         self.preloading = False  # Add preload flag
+        self.cover_downloads = set()  # Missing covers already fetched again this session
+        
+        self.library_generation, self.library_books = self.library_data.get_snapshot()  # Snapshot shown in the library view
+        self.library_tiles = {}  # Title -> tile frame
+        self.library_frame = None
+        self.library_loading = False  # True while tiles are still being created
+        self.showing_library = False
         
+        self.library_stats = LibraryStats(self.library_books)  # Built once, then updated by sync_library
+        self.similar_books = SimilarBooks(self.library_books)  # Cached feature vectors, also updated by sync_library
         self.show_search()
+        self.window.after(1000, self.check_external_changes)  # Watch for changes from other processes
+        
+        self.refresher = MetadataRefresher(  # Refresh stale ratings and genres in the background
+            self.library_data,
+            self.scraper,
+            is_busy=lambda: self.library_loading or not self.showing_library
+        )
+        self.refresher.start()
+        
+        self.profile_overlay = None  # Timing report toggled with F12
+        self.profile_timer = None  # Pending after() refreshing the overlay
+        self.window.bind("<F12>", lambda e: self.toggle_profile_overlay())
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
 
     def load_custom_fonts(self):
         """Load custom fonts for the application"""
@@ -47,6 +86,12 @@ class ModernLibraryGUI:
     def show_search(self):
         for widget in self.main_container.winfo_children():  # Clear container
             widget.destroy()
+        self.scheduler.cancel_owner('library')  # Drop work queued for the old view
+        
+        self.showing_library = True
+        self.library_tiles = {}
+        self.library_frame = None
+        self.library_loading = False
         
         title_section = ctk.CTkFrame(self.main_container, fg_color="transparent")  # Title section
         title_section.pack(fill="x", pady=(20, 30))
@@ -71,25 +116,21 @@ class ModernLibraryGUI:
         )
         search_entry.place(relx=0.5, rely=0.5, anchor="center")
         search_entry.bind("<Return>", lambda e: self.handle_search(search_entry.get()))
+        search_entry.bind("<KeyRelease>", lambda e: e.keysym == "Return" or self.scheduler.coalesce(
+            'search_typed', lambda: self.on_search_typed(search_entry), INTERACTIVE, owner='library'))
         
-        books = self.library_data.get_all_books()  # Show library section if there are books
-        if books:
+        self.suggestions_frame = ctk.CTkFrame(  # Instant matches shown under the search bar
+            self.main_container,
+            fg_color=("gray90", "gray17"),
+            corner_radius=8
+        )
+        
+        self.sync_library()
+        books = self.library_books
+        if books:  # Show library section if there are books
             self.preload_images(books)  # Start preloading images
             
-            sort_keys = {  # Define sort keys
-                'title': lambda x: x['Title'].lower() if x['Title'] else '',
-                'author': lambda x: x['Author'].lower() if x['Author'] else '',
-                'year': lambda x: int(x['Year']) if x['Year'] else 0,
-                'rating': lambda x: float(x['Rating']) if x['Rating'] else 0.0,
-                'date_added': lambda x: x['Date_Added'] if x['Date_Added'] else '',
-                'read': lambda x: (x.get('Read', False), x['Title'].lower())
-            }
-            
-            if self.current_sort['key'] in sort_keys:  # Sort books according to current sort state
-                books.sort(
-                    key=sort_keys[self.current_sort['key']], 
-                    reverse=self.current_sort['reverse']
-                )
+            books = self.sort_books(books)
             
             sort_frame = ctk.CTkFrame(self.main_container, fg_color="transparent")  # Create sorting buttons
             sort_frame.pack(fill="x", padx=50, pady=10)
@@ -125,6 +166,16 @@ class ModernLibraryGUI:
                 )
                 button.pack(side="left", padx=5)
             
+            ctk.CTkButton(  # Statistics dashboard
+                sort_frame,
+                text="Statistics",
+                width=120,
+                command=self.show_statistics,
+                font=self.fonts['normal'],
+                fg_color="#1B2838",
+                hover_color="#2A4157"
+            ).pack(side="right", padx=5)
+            
             library_container = ctk.CTkFrame(self.main_container, fg_color="transparent")  # Create container for library
             library_container.pack(fill="both", expand=True, padx=50, pady=20)
             
@@ -135,16 +186,109 @@ class ModernLibraryGUI:
                 scrollbar_button_hover_color=("gray70", "gray30")
             )
             library_frame.pack(fill="both", expand=True)
+            self.library_frame = library_frame
             
-            def load_batch(start_idx):  # Load books in batches
-                end_idx = min(start_idx + 5, len(books))
-                for i in range(start_idx, end_idx):
-                    self.create_library_entry(library_frame, books[i], i + 1)
-                if end_idx < len(books):
-                    self.window.after(50, lambda: load_batch(end_idx))
+            def load_tile(i):  # Queue tiles one at a time so each image follows its tile
+                self.create_library_entry(library_frame, books[i], i + 1)
+                if i + 1 < len(books):
+                    self.scheduler.submit(
+                        lambda: load_tile(i + 1),
+                        priority=VISIBLE if i + 1 < VISIBLE_TILES else BACKGROUND,
+                        owner='library'
+                    )
+                else:
+                    self.library_loading = False
             
-            load_batch(0)
+            self.library_loading = True
+            self.scheduler.submit(lambda: load_tile(0), priority=VISIBLE, owner='library')
+
+    @timed('library.sort')
+    def sort_books(self, books):
+        """Return books ordered by the current sort state"""
+        if self.current_sort['key'] in SORT_KEYS:
+            return sorted(
+                books,
+                key=SORT_KEYS[self.current_sort['key']],
+                reverse=self.current_sort['reverse']
+            )
+        return list(books)
+
+    def sync_library(self):
+        """Load the latest library and fold the difference into the derived indexes.
+
+        Every refresh of library_books goes through here, so the
+        statistics and recommendations always see exactly the changes the
+        snapshot moved by.
+        Returns (added, modified, removed).
+        """
+        generation, books = self.library_data.get_snapshot()
+        added, modified, removed = self.library_data.diff_snapshots(self.library_books, books)
+        self.library_generation = generation
+        self.library_books = books
+        if added or modified or removed:
+            self.library_stats.apply_changes(added, modified, removed)
+            self.similar_books.apply_changes(added, modified, removed)
+        return added, modified, removed
+
+    def check_external_changes(self):
+        """Patch the library view when another process commits a change"""
+        try:
+            if not self.library_loading and self.library_data.generation != self.library_generation:
+                self.show_library_changes(*self.sync_library())
+        except Exception as e:
+            logger.error("Error checking library changes: %s", e)
+        self.window.after(1000, self.check_external_changes)
 
+    def show_library_changes(self, added, modified, removed):
+        """Patch the library view for changes picked up by sync_library"""
+        if not self.showing_library or not (added or modified or removed):
+            return
+        logger.info("Library changed externally", extra={
+            'added': len(added), 'modified': len(modified), 'removed': len(removed)})
+        if self.library_loading:  # Tiles are still being created from the old snapshot
+            self.show_search()
+        else:
+            self.apply_library_changes(self.library_books, added, modified, removed)
+
+    def write_library(self, write):
+        """Run write(expected_generation) against the snapshot on screen.
+
+        If another process committed first, the snapshot and view are
+        brought up to date and the write is tried once more.
+        """
+        try:
+            return write(self.library_generation)
+        except LibraryConflictError:
+            self.show_library_changes(*self.sync_library())
+            return write(self.library_generation)
+
+    def apply_library_changes(self, books, added, modified, removed):
+        """Update only the tiles affected by a change"""
+        if self.library_frame is None or not books:  # Library appeared or emptied, rebuild the view
+            self.show_search()
+            return
+        
+        for title in removed + [book['Title'] for book in modified]:
+            tile = self.library_tiles.pop(title, None)
+            if tile:
+                tile.destroy()
+        
+        changed = added + modified
+        for book in changed:
+            self.create_library_entry(self.library_frame, book, 1)
+        
+        ordered = self.sort_books(books)  # Move new tiles into sorted position
+        changed_titles = {book['Title'] for book in changed}
+        next_tile = None
+        for book in reversed(ordered):
+            tile = self.library_tiles.get(book['Title'])
+            if tile is None:
+                continue
+            if book['Title'] in changed_titles and next_tile is not None:
+                tile.pack_configure(before=next_tile)
+            next_tile = tile
+
+    @timed('gui.create_tile')
     def create_library_entry(self, container, book, index):
         tile = ctk.CTkFrame(  # Create main tile with fixed size
             container,
@@ -154,6 +298,7 @@ class ModernLibraryGUI:
         )
         tile.pack(fill="x", pady=5)
         tile.pack_propagate(False)
+        self.library_tiles[book['Title']] = tile
         
         def load_image():  # Lazy load image
             if book['Local_Image_Path'] and os.path.exists(book['Local_Image_Path']):
@@ -162,7 +307,7 @@ class ModernLibraryGUI:
                     if cache_key in self.image_cache:  # Check cache first
                         return self.image_cache[cache_key]
                     
-                    with Image.open(book['Local_Image_Path']) as img:  # Load and process image
+                    with span('image.decode_resize'), Image.open(book['Local_Image_Path']) as img:  # Load and process image
                         img = img.resize((200, 280), Image.Resampling.LANCZOS)
                         if img.mode != 'RGB':
                             img = img.convert('RGB')
@@ -184,7 +329,7 @@ class ModernLibraryGUI:
                         self.image_cache[cache_key] = ctk_image
                         return ctk_image
                 except Exception as e:
-                    print(f"Error loading image: {e}")
+                    logger.error("Error loading image: %s", e)
                     return None
             return None
         
@@ -192,7 +337,12 @@ class ModernLibraryGUI:
         image_frame.pack(side="left", padx=20, pady=20)  # Same padding all around
         image_frame.pack_propagate(False)
         
-        def delayed_image_load():  # Load image after short delay
+        def delayed_image_load():  # Load image once the scheduler has time
+            if not image_frame.winfo_exists():  # Tile was removed before the image loaded
+                return
+            if self.download_missing_cover(book, lambda: self.scheduler.submit(
+                    delayed_image_load, priority=BACKGROUND, owner='library')):
+                return
             ctk_image = load_image()
             if ctk_image:
                 image_button = ctk.CTkButton(
@@ -207,7 +357,11 @@ class ModernLibraryGUI:
                 image_button.pack(fill="both", expand=True)  # Remove internal padding
                 self.create_tooltip(image_button, "Open Goodreads Page")
         
-        self.window.after(100 * index, delayed_image_load)  # Schedule image loading
+        self.scheduler.submit(  # Schedule image loading
+            delayed_image_load,
+            priority=VISIBLE if index <= VISIBLE_TILES else BACKGROUND,
+            owner='library'
+        )
         
         remove_button = ctk.CTkButton(  # Remove button
             tile,  # Parent is now the blue tile frame
@@ -274,6 +428,16 @@ class ModernLibraryGUI:
             anchor="w"
         ).pack(side="left")
         
+        ctk.CTkButton(  # Similar books
+            rating_frame,
+            text="Similar books",
+            width=120,
+            command=lambda: self.show_similar(book['Title']),
+            font=self.fonts['normal'],
+            fg_color="#1B2838",
+            hover_color="#2A4157"
+        ).pack(side="left", padx=20)
+        
         if book.get('Description'):  # Description
             description = book['Description']
             description_frame = ctk.CTkFrame(details_scroll, fg_color="transparent")
@@ -289,12 +453,87 @@ class ModernLibraryGUI:
             )
             description_label.pack(fill="x")
 
+    def on_search_typed(self, search_entry):
+        """Show local and memoized matches, then prefetch once typing pauses"""
+        if not search_entry.winfo_exists():
+            return
+        query = search_entry.get()
+        if self.search_debounce is not None:
+            self.window.after_cancel(self.search_debounce)
+            self.search_debounce = None
+        
+        self.show_suggestions(search_entry, query)
+        if len(query.strip()) >= 3:
+            self.search_debounce = self.window.after(
+                SEARCH_DEBOUNCE_MS, lambda: self.search_prefetcher.prefetch(query))
+
+    def show_suggestions(self, search_entry, query, limit=5):
+        """List library books and past searches matching the typed text"""
+        frame = self.suggestions_frame
+        if frame is None or not frame.winfo_exists():
+            return
+        for widget in frame.winfo_children():
+            widget.destroy()
+        
+        needle = self.search_prefetcher.normalize(query)
+        if not needle:
+            frame.place_forget()
+            return
+        
+        local_matches = []
+        for book in self.library_books:
+            if (needle in (book['Title'] or '').lower() or
+                    needle in (book['Author'] or '').lower()):
+                local_matches.append(book)
+                if len(local_matches) >= limit:
+                    break
+        past_queries = self.search_prefetcher.past_queries(needle, limit)
+        
+        if not local_matches and not past_queries:
+            frame.place_forget()
+            return
+        
+        for book in local_matches:
+            ctk.CTkLabel(
+                frame,
+                text=f"In your library: {book['Title']} by {book['Author']}",
+                font=self.fonts['normal'],
+                anchor="w"
+            ).pack(fill="x", padx=10, pady=2)
+        
+        for past_query in past_queries:
+            ctk.CTkButton(
+                frame,
+                text=f"Search again: {past_query}",
+                command=lambda q=past_query: self.handle_search(q),
+                font=self.fonts['normal'],
+                fg_color="transparent",
+                hover_color="#2A4157",
+                anchor="w"
+            ).pack(fill="x", padx=10, pady=2)
+        
+        frame.place(in_=search_entry, relx=0, rely=1.0, y=4, relwidth=1.0)
+        frame.lift()
+
     def handle_search(self, query):
         if not query.strip():
             return
         
+        if self.search_debounce is not None:
+            self.window.after_cancel(self.search_debounce)
+            self.search_debounce = None
+        
         for widget in self.main_container.winfo_children():  # Show loading
             widget.destroy()
+        self.scheduler.cancel_owner('library')
+        self.showing_library = False
+        self.library_loading = False
+        self.suggestions_frame = None
+        
+        cached = self.search_prefetcher.cached_results(query)
+        if cached is not None:  # Prefetch already has everything, skip the loading screen
+            self.show_results(cached)
+            return
         
         loading_label = ctk.CTkLabel(
             self.main_container,
@@ -307,11 +546,168 @@ class ModernLibraryGUI:
 
     def search_and_display(self, query):
         try:
-            results = self.scraper.search_books(query)
+            results = self.search_prefetcher.search(query)
             self.show_results(results)
         except Exception as e:
             self.show_error(str(e))
 
+    def show_similar(self, title):
+        """Show the library books most similar to title"""
+        matches = self.similar_books.similar(title, k=5)
+        books_by_title = {book['Title']: book for book in self.library_books}
+        
+        for widget in self.main_container.winfo_children():  # Clear container
+            widget.destroy()
+        self.scheduler.cancel_owner('library')
+        self.showing_library = False
+        self.library_loading = False
+        
+        title_section = ctk.CTkFrame(self.main_container, fg_color="transparent")  # Title section
+        title_section.pack(fill="x", pady=(20, 30))
+        
+        ctk.CTkLabel(  # Main title
+            title_section,
+            text="Similar Books",
+            font=self.fonts['title'],
+            text_color="white"
+        ).pack(pady=10)
+        
+        back_button = ctk.CTkButton(  # Back button
+            self.main_container,
+            text="← Back to Library",
+            command=self.show_search,
+            width=150,
+            font=self.fonts['normal'],
+            fg_color="#1B2838",
+            hover_color="#2A4157"
+        )
+        back_button.pack(anchor="w", padx=50, pady=(0, 10))
+        
+        ctk.CTkLabel(
+            self.main_container,
+            text=f"Books in your library like {title}",
+            font=self.fonts['header'],
+            anchor="w"
+        ).pack(fill="x", padx=50, pady=(0, 10))
+        
+        similar_container = ctk.CTkScrollableFrame(  # Make results scrollable
+            self.main_container,
+            fg_color="transparent",
+            height=600,
+            scrollbar_button_hover_color=("gray70", "gray30")
+        )
+        similar_container.pack(fill="both", expand=True, padx=50)
+        
+        matches = [(books_by_title[match], score) for match, score in matches if match in books_by_title]
+        if not matches:  # Show message if nothing is similar
+            ctk.CTkLabel(
+                similar_container,
+                text="No similar books in your library yet",
+                font=self.fonts['header']
+            ).pack(pady=20)
+            return
+        
+        for index, (book, score) in enumerate(matches, start=1):
+            ctk.CTkLabel(
+                similar_container,
+                text=f"{score:.0%} match",
+                font=self.fonts['normal'],
+                anchor="w"
+            ).pack(fill="x", pady=(10, 0))
+            self.create_library_entry(similar_container, book, index)
+
+    def show_statistics(self):
+        """Show library statistics from the incrementally maintained aggregates"""
+        for widget in self.main_container.winfo_children():  # Clear container
+            widget.destroy()
+        self.scheduler.cancel_owner('library')
+        self.showing_library = False
+        self.library_loading = False
+        
+        stats = self.library_stats.summary()
+        
+        title_section = ctk.CTkFrame(self.main_container, fg_color="transparent")  # Title section
+        title_section.pack(fill="x", pady=(20, 30))
+        
+        ctk.CTkLabel(  # Main title
+            title_section,
+            text="Library Statistics",
+            font=self.fonts['title'],
+            text_color="white"
+        ).pack(pady=10)
+        
+        back_button = ctk.CTkButton(  # Back button
+            self.main_container,
+            text="← Back to Library",
+            command=self.show_search,
+            width=150,
+            font=self.fonts['normal'],
+            fg_color="#1B2838",
+            hover_color="#2A4157"
+        )
+        back_button.pack(anchor="w", padx=50, pady=(0, 20))
+        
+        stats_container = ctk.CTkScrollableFrame(  # Make statistics scrollable
+            self.main_container,
+            fg_color="transparent",
+            height=600,
+            scrollbar_button_hover_color=("gray70", "gray30")
+        )
+        stats_container.pack(fill="both", expand=True, padx=50)
+        
+        ctk.CTkLabel(  # Overview
+            stats_container,
+            text=(f"{stats['books']} books  |  average rating {stats['average_rating']:.2f}  |  "
+                  f"read {stats['books_read']} ({stats['pages_read']:,} pages)  |  "
+                  f"unread {stats['books_unread']} ({stats['pages_unread']:,} pages)"),
+            font=self.fonts['normal'],
+            anchor="w"
+        ).pack(fill="x", pady=(0, 10))
+        
+        self.create_stat_bars(stats_container, "Pages read vs. unread", [
+            ("Read", stats['pages_read']),
+            ("Unread", stats['pages_unread'])
+        ])
+        self.create_stat_bars(stats_container, "Ratings", [
+            (f"{low:.1f} - {high:.1f}", count) for low, high, count in stats['rating_histogram']
+        ])
+        self.create_stat_bars(stats_container, "Publication decade", [
+            ("Unknown" if decade == 0 else f"{decade}s", count) for decade, count in stats['decade_histogram']
+        ])
+        self.create_stat_bars(stats_container, "Top authors", stats['top_authors'])
+        self.create_stat_bars(stats_container, "Top genres", stats['top_genres'])
+        self.create_stat_bars(stats_container, "Genres found together", [
+            (f"{first} + {second}", count) for first, second, count in stats['genre_pairs']
+        ])
+
+    def create_stat_bars(self, container, heading, rows):
+        """Horizontal bar chart of (label, count) rows"""
+        section = ctk.CTkFrame(container, fg_color=("gray95", "gray15"), corner_radius=10)
+        section.pack(fill="x", pady=5)
+        
+        ctk.CTkLabel(
+            section,
+            text=heading,
+            font=self.fonts['header'],
+            anchor="w"
+        ).grid(row=0, column=0, columnspan=3, sticky="w", padx=20, pady=(10, 5))
+        
+        if not rows:
+            ctk.CTkLabel(section, text="No data yet", font=self.fonts['normal']).grid(
+                row=1, column=0, sticky="w", padx=20, pady=(0, 10))
+            return
+        
+        largest = max(count for _, count in rows) or 1
+        for i, (label, count) in enumerate(rows, start=1):
+            ctk.CTkLabel(section, text=label, font=self.fonts['normal'], anchor="w", width=260).grid(
+                row=i, column=0, sticky="w", padx=(20, 10), pady=2)
+            bar = ctk.CTkProgressBar(section, width=500, height=14, progress_color="#2A4157")
+            bar.set(count / largest)
+            bar.grid(row=i, column=1, sticky="w", pady=2)
+            ctk.CTkLabel(section, text=f"{count:,}", font=self.fonts['normal'], anchor="e").grid(
+                row=i, column=2, sticky="e", padx=(10, 20), pady=2)
+        ctk.CTkFrame(section, height=10, fg_color="transparent").grid(row=len(rows) + 1, column=0)
+
     def show_results(self, results):
         for widget in self.main_container.winfo_children():  # Clear container
             widget.destroy()
@@ -356,6 +752,46 @@ class ModernLibraryGUI:
         for result in results:  # Create tiles for each result
             self.create_result_tile(results_container, result)
 
+    def download_missing_cover(self, book, done):
+        """Fetch a cover whose file is gone (e.g. evicted by cleanup.py --maintain).
+
+        Returns False if there is nothing to download, otherwise downloads
+        in a thread and calls done on the Tk thread once it finishes.
+        """
+        path = book['Local_Image_Path']
+        if (not path or path == 'None' or os.path.exists(path) or path in self.cover_downloads
+                or not book.get('Image_URL') or book['Image_URL'] == 'None'):
+            return False
+        self.cover_downloads.add(path)  # One attempt per session
+        self.run_in_background(
+            lambda: save_image(book['Image_URL'], book['Title'], os.path.dirname(path) or "book_covers",
+                               scraper=self.scraper),
+            lambda _: done()
+        )
+        return True
+
+    def run_in_background(self, work, done):
+        """Run work() in a thread, then done(result) on the Tk thread (None if work failed)"""
+        outcome = {}
+        finished = threading.Event()
+        
+        def run():
+            try:
+                outcome['result'] = work()
+            except Exception as e:
+                logger.error("Error in background task: %s", e)
+            finally:
+                finished.set()
+        
+        def wait():  # Poll from the Tk thread, widgets must not be touched from the worker
+            if finished.is_set():
+                done(outcome.get('result'))
+            else:
+                self.window.after(100, wait)
+        
+        threading.Thread(target=run, daemon=True).start()
+        wait()
+
     def preload_images(self, books):
         """Preload and compress images in a separate thread"""
         def preload():
@@ -365,7 +801,7 @@ class ModernLibraryGUI:
                     cache_key = book['Local_Image_Path']
                     if cache_key not in self.image_cache:
                         try:
-                            with Image.open(book['Local_Image_Path']) as img:  # Open and resize image
+                            with span('image.preload'), Image.open(book['Local_Image_Path']) as img:  # Open and resize image
                                 img = img.resize((200, 280), Image.Resampling.LANCZOS)
                                 if img.mode != 'RGB':
                                     img = img.convert('RGB')
@@ -386,14 +822,14 @@ class ModernLibraryGUI:
                                 
                                 self.image_cache[cache_key] = ctk_image
                         except Exception as e:
-                            print(f"Error preloading image: {e}")
+                            logger.error("Error preloading image: %s", e)
             self.preloading = False
         
         threading.Thread(target=preload, daemon=True).start()  # Start preloading thread
 
     def sort_library(self, key, reverse=False):
         """Sort library by given key and refresh display"""
-        print(f"Sorting by {key} {'descending' if reverse else 'ascending'}")
+        logger.debug("Sorting library", extra={'key': key, 'reverse': reverse})
         
         self.current_sort = {  # Update current sort state
             'key': key,
@@ -435,7 +871,8 @@ class ModernLibraryGUI:
                 tooltip_label = None
         
         widget.bind("<Enter>", show_tooltip)
-        widget.bind("<Motion>", lambda e: self.window.after(5, lambda: update_position(e)))
+        widget.bind("<Motion>", lambda e: self.scheduler.coalesce(  # One move per frame, latest position wins
+            ('tooltip', str(widget)), lambda: update_position(e)))
         widget.bind("<Leave>", hide_tooltip)
 
     def open_goodreads(self, url):
@@ -459,6 +896,9 @@ class ModernLibraryGUI:
         """Show error message and return to search after delay"""
         for widget in self.main_container.winfo_children():
             widget.destroy()
+        self.scheduler.cancel_owner('library')
+        self.showing_library = False
+        self.library_loading = False
         
         error_label = ctk.CTkLabel(
             self.main_container,
@@ -484,25 +924,31 @@ class ModernLibraryGUI:
         left_frame.pack(side="left", padx=20, pady=(20, 10))  # Adjusted padding
         
         if book.get('Image_URL'):  # Load and display image
-            try:
-                response = requests.get(book['Image_URL'])
-                image = Image.open(BytesIO(response.content))
-                image = image.resize((100, 140), Image.Resampling.LANCZOS)
-                
-                ctk_image = ctk.CTkImage(
-                    light_image=image,
-                    dark_image=image,
-                    size=(100, 140)
-                )
-                
-                image_label = ctk.CTkLabel(
-                    left_frame,
-                    image=ctk_image,
-                    text=""
-                )
-                image_label.pack(pady=(0, 10))
-            except Exception as e:
-                print(f"Error loading image: {e}")
+            image_label = ctk.CTkLabel(left_frame, text="", width=100, height=140)
+            image_label.pack(pady=(0, 10))
+            
+            def show_cover(data):
+                if data is None or not image_label.winfo_exists():
+                    return
+                try:
+                    with span('image.decode_resize'):
+                        image = Image.open(BytesIO(data))
+                        image = image.resize((100, 140), Image.Resampling.LANCZOS)
+                    
+                    ctk_image = ctk.CTkImage(
+                        light_image=image,
+                        dark_image=image,
+                        size=(100, 140)
+                    )
+                    image_label.configure(image=ctk_image)
+                except Exception as e:
+                    logger.error("Error loading image: %s", e)
+            
+            data = self.search_prefetcher.cover(book['Image_URL'])  # Warmed along with the search
+            if data is not None:
+                show_cover(data)
+            else:  # Not prefetched, don't block the Tk thread on it
+                self.run_in_background(lambda: self.search_prefetcher.fetch_cover(book['Image_URL']), show_cover)
         
         add_button = ctk.CTkButton(  # Add to library button
             left_frame,
@@ -578,11 +1024,12 @@ class ModernLibraryGUI:
         """Add a book to the library"""
         try:
             if book.get('Image_URL'):  # Save image locally
-                local_image = save_image(book['Image_URL'], book['Title'])
+                local_image = save_image(book['Image_URL'], book['Title'], scraper=self.scraper)
                 if local_image:
                     book['Local_Image_Path'] = local_image
             
-            if self.library_data.add_book(book):  # Add to library
+            if self.write_library(lambda generation: self.library_data.add_book(  # Add to library
+                    book, expected_generation=generation)):
                 self.show_search()  # Refresh display
         except Exception as e:
             self.show_error(str(e))
@@ -590,11 +1037,52 @@ class ModernLibraryGUI:
     def remove_book(self, title):
         """Remove a book from the library"""
         try:
-            if self.library_data.remove_book(title):
+            if self.write_library(lambda generation: self.library_data.remove_book(
+                    title, expected_generation=generation)):
                 self.show_search()  # Refresh display
         except Exception as e:
             self.show_error(str(e))
 
+    def toggle_profile_overlay(self):
+        """Show or hide a live p50/p95 timing table over the window"""
+        if self.profile_overlay is not None:
+            if self.profile_timer is not None:
+                self.window.after_cancel(self.profile_timer)
+                self.profile_timer = None
+            self.profile_overlay.destroy()
+            self.profile_overlay = None
+            return
+        
+        instrumentation.enable()  # Start collecting if it was off
+        self.profile_overlay = ctk.CTkLabel(
+            self.window,
+            text="",
+            font=("Consolas", 12),
+            fg_color=("gray85", "gray10"),
+            corner_radius=6,
+            justify="left",
+            anchor="nw",
+            padx=10,
+            pady=10
+        )
+        self.profile_overlay.place(relx=1.0, x=-10, y=10, anchor="ne")
+        
+        def refresh():
+            if self.profile_overlay is not None:
+                self.profile_overlay.configure(text=instrumentation.report())
+                self.profile_overlay.lift()
+                self.profile_timer = self.window.after(1000, refresh)
+        
+        refresh()
+
+    def close(self):
+        """Stop background work and close the window"""
+        self.refresher.stop()
+        self.window.destroy()
+
     def run(self):
         """Start the main event loop"""
-        self.window.mainloop()
\ No newline at end of file
+        try:
+            self.window.mainloop()
+        finally:
+            self.refresher.stop(timeout=5)  # Workers only finish the request in flight
\ No newline at end of file
@@ -0,0 +1,140 @@
+import threading
+
+import numpy as np
+
+from library_data import GENRE_FIELDS
+
+MAX_FEATURES = 7  # Four genres, author, decade and rating band
+FEATURE_WEIGHTS = {  # How much each kind of feature counts towards similarity
+    'genre': 1.0,
+    'author': 1.5,
+    'decade': 0.5,
+    'rating': 0.3
+}
+
+class SimilarBooks:
+    """Cosine similarity over sparse per-book feature vectors.
+
+    Each book is stored as up to MAX_FEATURES (feature id, weight) pairs
+    in fixed-width NumPy arrays, with its vector norm cached. A query
+    scatters the book's features into a dense vector and scores every
+    book with one gather and row sum. Rows are updated in place on
+    add/remove, so nothing is rebuilt per click.
+    """
+    def __init__(self, books=(), capacity=1024):
+        self.lock = threading.Lock()
+        self.size = 0
+        self.rows = {}  # Title -> row index
+        self.titles = []  # Row index -> title
+        self.features = np.zeros((capacity, MAX_FEATURES), dtype=np.int32)
+        self.weights = np.zeros((capacity, MAX_FEATURES), dtype=np.float32)  # 0 marks an unused slot
+        self.norms = np.ones(capacity, dtype=np.float32)
+        self.feature_ids = {}  # (kind, value) -> feature id
+        with self.lock:
+            for book in books:
+                self._upsert(book)
+
+    def _feature(self, kind, value):
+        key = (kind, value)
+        if key not in self.feature_ids:
+            self.feature_ids[key] = len(self.feature_ids)
+        return self.feature_ids[key]
+
+    def _vector(self, book):
+        """Sparse (ids, weights) for a book"""
+        pairs = {}
+        for field in GENRE_FIELDS:
+            genre = book.get(field)
+            if genre and genre != 'None':
+                pairs[self._feature('genre', genre.lower())] = FEATURE_WEIGHTS['genre']
+        author = book.get('Author')
+        if author and author != 'Unknown Author':
+            pairs[self._feature('author', author.lower())] = FEATURE_WEIGHTS['author']
+        try:
+            year = int(book.get('Year') or 0)
+        except (TypeError, ValueError):
+            year = 0
+        if year:
+            pairs[self._feature('decade', year // 10)] = FEATURE_WEIGHTS['decade']
+        try:
+            rating = float(book.get('Rating') or 0)
+        except (TypeError, ValueError):
+            rating = 0.0
+        if rating:
+            pairs[self._feature('rating', int(rating * 2))] = FEATURE_WEIGHTS['rating']  # Half-star bands
+
+        ids = np.zeros(MAX_FEATURES, dtype=np.int32)
+        weights = np.zeros(MAX_FEATURES, dtype=np.float32)
+        items = list(pairs.items())[:MAX_FEATURES]
+        ids[:len(items)] = [feature for feature, _ in items]
+        weights[:len(items)] = [weight for _, weight in items]
+        return ids, weights
+
+    def _grow(self, needed):
+        capacity = len(self.norms)
+        if needed <= capacity:
+            return
+        new_capacity = max(needed, capacity * 2)
+        for name, fill in (('features', 0), ('weights', 0), ('norms', 1)):
+            column = getattr(self, name)
+            grown = np.full((new_capacity,) + column.shape[1:], fill, dtype=column.dtype)
+            grown[:capacity] = column
+            setattr(self, name, grown)
+
+    def _upsert(self, book):
+        title = book['Title']
+        row = self.rows.get(title)
+        if row is None:
+            row = self.size
+            self._grow(row + 1)
+            self.rows[title] = row
+            self.titles.append(title)
+            self.size += 1
+        ids, weights = self._vector(book)
+        self.features[row] = ids
+        self.weights[row] = weights
+        norm = float(np.sqrt(np.dot(weights, weights)))
+        self.norms[row] = norm or 1.0
+
+    def _remove(self, title):
+        row = self.rows.pop(title, None)
+        if row is None:
+            return
+        last = self.size - 1
+        if row != last:  # Move the last row into the hole
+            self.features[row] = self.features[last]
+            self.weights[row] = self.weights[last]
+            self.norms[row] = self.norms[last]
+            self.titles[row] = self.titles[last]
+            self.rows[self.titles[row]] = row
+        self.titles.pop()
+        self.weights[last] = 0
+        self.size -= 1
+
+    def apply_changes(self, added, modified, removed):
+        """Fold a commit into the cached vectors; safe to apply twice"""
+        with self.lock:
+            for title in removed:
+                self._remove(title)
+            for book in list(added) + list(modified):
+                self._upsert(book)
+
+    def similar(self, title, k=5):
+        """Top-k (title, score) pairs most similar to the given library book"""
+        with self.lock:
+            row = self.rows.get(title)
+            if row is None or self.size < 2:
+                return []
+            query = np.zeros(len(self.feature_ids), dtype=np.float32)
+            used = self.weights[row] > 0  # Unused slots point at feature 0 with weight 0
+            query[self.features[row][used]] = self.weights[row][used]
+
+            n = self.size
+            scores = (query[self.features[:n]] * self.weights[:n]).sum(axis=1)  # Sparse dot products
+            scores /= self.norms[:n] * self.norms[row]
+            scores[row] = -1.0  # Never recommend the book itself
+
+            k = min(k, n - 1)
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top], kind='stable')]
+            return [(self.titles[i], float(scores[i])) for i in top if scores[i] > 0]
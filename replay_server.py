@@ -0,0 +1,224 @@
+import argparse
+import os
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import requests
+from bs4 import BeautifulSoup
+
+from web_scraper import GoodreadsScraper
+
+BASE_PLACEHOLDER = "__REPLAY_BASE__"  # Replaced with the server URL when a page is served
+GOODREADS_URL = "https://www.goodreads.com"
+
+def slugify(text):
+    """File-system safe name for a query or URL path"""
+    return re.sub(r'[^A-Za-z0-9_-]+', '_', text).strip('_') or 'index'
+
+def _image_name(url_path):
+    """Recorded image file for an /images/ path, ignoring size suffixes like ._SX1200_"""
+    return os.path.basename(url_path).split('.')[0] + ".jpg"
+
+def synthesize_recordings(directory, queries, books=30, seed=0):
+    """Write fake search and book pages that match the scraper's selectors"""
+    rng = random.Random(seed)
+    genres = ['Fiction', 'Fantasy', 'Classics', 'Mystery', 'History', 'Romance', 'Science', 'Horror']
+    os.makedirs(os.path.join(directory, 'search'), exist_ok=True)
+    os.makedirs(os.path.join(directory, 'book', 'show'), exist_ok=True)
+    os.makedirs(os.path.join(directory, 'images'), exist_ok=True)
+
+    for book_id in range(books):
+        book_genres = "".join(
+            f'<a class="Button__link" href="/genres/{g.lower()}">{g}</a>'
+            for g in rng.sample(genres, 4))
+        description = " ".join(f"Paragraph {i} of the story of book {book_id}." for i in range(40))
+        page = (
+            f'<html><body><div class="BookCover__image"><img src="{BASE_PLACEHOLDER}/images/{book_id}._SY475_.jpg"></div>'
+            f'<h1 class="Text__title1">Replay Book {book_id}</h1>'
+            f'<span class="ContributorLink__name">Author {book_id % 7}</span>'
+            f'<div class="RatingStatistics__rating">{rng.uniform(2.5, 4.9):.2f}</div>'
+            f'<div class="DetailsLayoutRightParagraph__widthConstrained">{description}</div>'
+            f'<div class="BookPageMetadataSection__genres"><span>Genres</span>{book_genres}</div>'
+            f'<div class="FeaturedDetails"><p>{rng.randint(80, 900)} pages, Hardcover</p>'
+            f'<p>First published March 3, {rng.randint(1850, 2023)}</p></div>'
+            + '<div class="filler">' + "x" * 150000 + '</div>'  # Real pages are large
+            + '</body></html>')
+        with open(os.path.join(directory, 'book', 'show', f"{book_id}.html"), 'w', encoding='utf-8') as file:
+            file.write(page)
+        with open(os.path.join(directory, 'images', f"{book_id}.jpg"), 'wb') as file:  # Placeholder bytes, never decoded
+            file.write(b'\xff\xd8\xff\xe0' + rng.randbytes(60000) + b'\xff\xd9')
+
+    for query in queries:
+        picks = rng.sample(range(books), 5)
+        rows = "".join(
+            f'<tr itemtype="http://schema.org/Book"><td>'
+            f'<a class="bookTitle" href="/book/show/{book_id}">Replay Book {book_id}</a></td></tr>'
+            for book_id in picks)
+        with open(os.path.join(directory, 'search', f"{slugify(query)}.html"), 'w', encoding='utf-8') as file:
+            file.write(f"<html><body><table>{rows}</table></body></html>")
+
+def record_query(query, directory, limit=3):
+    """Save the live search page for query plus its top book pages and covers"""
+    scraper = GoodreadsScraper()
+    os.makedirs(os.path.join(directory, 'search'), exist_ok=True)
+    os.makedirs(os.path.join(directory, 'images'), exist_ok=True)
+
+    search_url = f"{GOODREADS_URL}/search?q={query.replace(' ', '+')}"
+    response = requests.get(search_url, headers=scraper.headers, timeout=10)
+    response.raise_for_status()
+    html = response.text.replace(GOODREADS_URL, "")  # Keep links relative to the replay server
+    with open(os.path.join(directory, 'search', f"{slugify(query)}.html"), 'w', encoding='utf-8') as file:
+        file.write(html)
+
+    soup = BeautifulSoup(html, 'html.parser')
+    for link in soup.select('tr[itemtype="http://schema.org/Book"] a.bookTitle')[:limit]:
+        path = urlparse(link['href']).path
+        print(f"Recording {path}")
+        time.sleep(1)  # Respectful delay between requests
+        page = requests.get(GOODREADS_URL + path, headers=scraper.headers, timeout=10)
+        page.raise_for_status()
+        page_html = page.text
+
+        image_url = scraper._get_detailed_image(BeautifulSoup(page_html, 'html.parser'))
+        if image_url:
+            image_url = image_url.replace('._SX1200_', '._SY475_')  # URL as it appears in the page
+            image = requests.get(image_url, timeout=10)
+            if image.ok:
+                name = _image_name(urlparse(image_url).path)
+                with open(os.path.join(directory, 'images', name), 'wb') as file:
+                    file.write(image.content)
+                page_html = page_html.replace(image_url, f"{BASE_PLACEHOLDER}/images/{os.path.basename(urlparse(image_url).path)}")
+
+        page_file = os.path.join(directory, *path.strip('/').split('/')[:-1], slugify(path.split('/')[-1]) + ".html")
+        os.makedirs(os.path.dirname(page_file), exist_ok=True)
+        with open(page_file, 'w', encoding='utf-8') as file:
+            file.write(page_html.replace(GOODREADS_URL, ""))
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    """Serve recorded pages with the owning server's fault settings"""
+    def do_GET(self):
+        server = self.server.replay
+        delay = server.latency + random.uniform(-server.jitter, server.jitter)
+        if delay > 0:
+            time.sleep(delay)
+
+        roll = random.random()
+        if roll < server.rate_limit_rate:  # Simulated throttling
+            return self._send(429, b"Too Many Requests", 'text/plain', {'Retry-After': str(server.retry_after)})
+        if roll < server.rate_limit_rate + server.error_rate:  # Simulated server failure
+            return self._send(500, b"Internal Server Error", 'text/plain')
+
+        path = self._resolve(urlparse(self.path))
+        if not path or not os.path.isfile(path):
+            return self._send(404, b"Not Found", 'text/plain')
+
+        with open(path, 'rb') as file:
+            body = file.read()
+        if path.endswith('.html'):
+            body = body.replace(BASE_PLACEHOLDER.encode(), server.url.encode())
+            return self._send(200, body, 'text/html; charset=utf-8')
+        return self._send(200, body, 'image/jpeg')
+
+    def _resolve(self, url):
+        """Map a request path onto a recorded file"""
+        directory = self.server.replay.directory
+        if url.path == '/search':
+            query = parse_qs(url.query).get('q', [''])[0]
+            path = os.path.join(directory, 'search', f"{slugify(query)}.html")
+            return path if os.path.exists(path) else os.path.join(directory, 'search.html')
+        if url.path.startswith('/images/'):
+            return os.path.join(directory, 'images', _image_name(url.path))
+        parts = url.path.strip('/').split('/')
+        if len(parts) >= 2 and parts[0] == 'book':
+            return os.path.join(directory, *parts[:-1], slugify(parts[-1]) + ".html")
+        return None
+
+    def _send(self, status, body, content_type, headers=None):
+        self.server.replay.count(status)
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):  # Keep load tests quiet
+        pass
+
+class ReplayServer:
+    """Local stand-in for goodreads.com serving recorded pages"""
+    def __init__(self, directory, host="127.0.0.1", port=0, latency_ms=0, jitter_ms=0,
+                 error_rate=0.0, rate_limit_rate=0.0, retry_after=1):
+        self.directory = directory
+        self.latency = latency_ms / 1000.0
+        self.jitter = jitter_ms / 1000.0
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after  # Seconds advertised in 429 responses
+        self.status_counts = {}
+        self.lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), ReplayHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.replay = self
+        self.url = f"http://{host}:{self.httpd.server_address[1]}"
+        self.thread = None
+
+    def count(self, status):
+        with self.lock:
+            self.status_counts[status] = self.status_counts.get(status, 0) + 1
+
+    def start(self):
+        """Serve from a background thread"""
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline Goodreads replay server")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    serve = subparsers.add_parser('serve', help="serve recorded pages")
+    serve.add_argument('--dir', default='recordings')
+    serve.add_argument('--port', type=int, default=8765)
+    serve.add_argument('--latency', type=float, default=0, help="base latency in ms")
+    serve.add_argument('--jitter', type=float, default=0, help="random +/- latency in ms")
+    serve.add_argument('--error-rate', type=float, default=0.0, help="fraction of 500 responses")
+    serve.add_argument('--rate-limit', type=float, default=0.0, help="fraction of 429 responses")
+    serve.add_argument('--retry-after', type=int, default=1)
+
+    synthesize = subparsers.add_parser('synthesize', help="write fake pages for offline use")
+    synthesize.add_argument('--dir', default='recordings')
+    synthesize.add_argument('--books', type=int, default=30)
+    synthesize.add_argument('queries', nargs='+')
+
+    record = subparsers.add_parser('record', help="record live pages for a query")
+    record.add_argument('--dir', default='recordings')
+    record.add_argument('query')
+
+    args = parser.parse_args()
+    if args.command == 'synthesize':
+        synthesize_recordings(args.dir, args.queries, args.books)
+        print(f"Wrote {args.books} books and {len(args.queries)} searches to {args.dir}")
+    elif args.command == 'record':
+        record_query(args.query, args.dir)
+    else:
+        server = ReplayServer(args.dir, port=args.port, latency_ms=args.latency, jitter_ms=args.jitter,
+                              error_rate=args.error_rate, rate_limit_rate=args.rate_limit,
+                              retry_after=args.retry_after)
+        print(f"Replaying {args.dir} on {server.url}")
+        try:
+            server.httpd.serve_forever()
+        except KeyboardInterrupt:
+            server.stop()
+
+if __name__ == "__main__":
+    main()
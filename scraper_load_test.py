@@ -0,0 +1,151 @@
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from bs4 import BeautifulSoup
+
+from benchmark import percentile
+from replay_server import ReplayServer, synthesize_recordings
+from web_scraper import GoodreadsScraper, GoodreadsScraperError, save_image
+
+def summarize(latencies, elapsed, failures):
+    """Throughput and latency percentiles for one phase"""
+    if not latencies:
+        return {'operations': 0, 'failures': failures}
+    return {
+        'operations': len(latencies),
+        'failures': failures,
+        'per_second': len(latencies) / elapsed if elapsed else None,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p95_ms': percentile(latencies, 95) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+        'max_ms': max(latencies) * 1000
+    }
+
+def run_phase(items, operation, concurrency):
+    """Call operation(item) for every item and time each call.
+
+    operation returns a falsy value on failure.
+    """
+    def timed(item):
+        start = time.perf_counter()
+        try:
+            ok = operation(item)
+        except GoodreadsScraperError:
+            ok = False
+        return time.perf_counter() - start, bool(ok)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(timed, items))
+    elapsed = time.perf_counter() - start
+    latencies = [latency for latency, ok in results if ok]
+    return summarize(latencies, elapsed, len(results) - len(latencies))
+
+def measure_parse(scraper, directory):
+    """Time BeautifulSoup parsing plus field extraction on every recorded book page"""
+    parse_times = []
+    extract_times = []
+    for root, _, files in os.walk(os.path.join(directory, 'book')):
+        for name in files:
+            with open(os.path.join(root, name), 'r', encoding='utf-8') as file:
+                html = file.read()
+            start = time.perf_counter()
+            soup = BeautifulSoup(html, 'html.parser')
+            parsed = time.perf_counter()
+            scraper._parse_book_page(soup, name)
+            parse_times.append(parsed - start)
+            extract_times.append(time.perf_counter() - parsed)
+    return {
+        'pages': len(parse_times),
+        'html_parse': summarize(parse_times, sum(parse_times), 0),
+        'field_extraction': summarize(extract_times, sum(extract_times), 0)
+    }
+
+def run_load_test(directory, queries, searches, concurrency, server_options):
+    """Drive the scraper against a replay server and collect the numbers"""
+    server = ReplayServer(directory, **server_options).start()
+    scraper = GoodreadsScraper(base_url=server.url, request_delay=0)
+    image_folder = tempfile.mkdtemp(prefix='replay_covers_')
+    report = {'server': dict(server_options, url=server.url), 'concurrency': concurrency}
+    try:
+        search_queries = [queries[i % len(queries)] for i in range(searches)]
+        found = []
+        report['search_books'] = run_phase(
+            search_queries, lambda query: found.extend(scraper.search_books(query)) or True, concurrency)
+
+        book_urls = sorted({book['Goodreads_URL'] for book in found})
+        report['get_detailed_book_data'] = run_phase(
+            book_urls, scraper._get_detailed_book_data, concurrency)
+
+        image_urls = sorted({book['Image_URL'] for book in found if book.get('Image_URL')})
+        report['save_image'] = run_phase(
+            list(enumerate(image_urls)),
+            lambda item: save_image(item[1], f"cover {item[0]}", image_folder, scraper), concurrency)
+
+        report['parse'] = measure_parse(scraper, directory)
+        report['retries'] = scraper.retries
+        report['status_counts'] = {str(k): v for k, v in sorted(server.status_counts.items())}
+    finally:
+        server.stop()
+        shutil.rmtree(image_folder, ignore_errors=True)
+    return report
+
+def print_report(report):
+    """Print the headline numbers of a load test"""
+    for phase in ('search_books', 'get_detailed_book_data', 'save_image'):
+        stats = report[phase]
+        if not stats['operations']:
+            print(f"{phase:<24} no successful calls, {stats['failures']} failures")
+            continue
+        print(f"{phase:<24}{stats['per_second']:>8.2f}/s  p50 {stats['p50_ms']:.1f} ms  "
+              f"p95 {stats['p95_ms']:.1f} ms  p99 {stats['p99_ms']:.1f} ms  failures {stats['failures']}")
+    parse = report['parse']
+    if parse['pages']:
+        print(f"{'parse per page':<24}html p50 {parse['html_parse']['p50_ms']:.1f} ms  "
+              f"fields p50 {parse['field_extraction']['p50_ms']:.1f} ms  ({parse['pages']} pages)")
+    print(f"{'retries':<24}{report['retries']}  server statuses {report['status_counts']}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Scraper throughput against the replay server")
+    parser.add_argument('--dir', help="recorded pages (default: synthesize into a temp dir)")
+    parser.add_argument('--queries', nargs='+', default=['dune', 'gatsby', 'dracula', 'emma', 'ulysses'])
+    parser.add_argument('--searches', type=int, default=20)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--latency', type=float, default=50, help="base latency in ms")
+    parser.add_argument('--jitter', type=float, default=20, help="random +/- latency in ms")
+    parser.add_argument('--error-rate', type=float, default=0.02)
+    parser.add_argument('--rate-limit', type=float, default=0.03)
+    parser.add_argument('--retry-after', type=int, default=1)
+    parser.add_argument('--output', help="save the report as JSON")
+    args = parser.parse_args()
+
+    directory = args.dir
+    if not directory:
+        directory = tempfile.mkdtemp(prefix='replay_pages_')
+        synthesize_recordings(directory, args.queries)
+
+    try:
+        report = run_load_test(directory, args.queries, args.searches, args.concurrency, {
+            'latency_ms': args.latency,
+            'jitter_ms': args.jitter,
+            'error_rate': args.error_rate,
+            'rate_limit_rate': args.rate_limit,
+            'retry_after': args.retry_after
+        })
+    finally:
+        if not args.dir:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    print_report(report)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(report, file, indent=2)
+        print(f"Results saved to {args.output}")
+
+if __name__ == "__main__":
+    main()
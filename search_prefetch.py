@@ -0,0 +1,155 @@
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from time import sleep
+
+import requests
+
+from web_scraper import GoodreadsScraperError
+
+logger = logging.getLogger(__name__)
+
+class SearchPrefetcher:
+    """Memoized Goodreads searches with cancellable background prefetch"""
+    def __init__(self, scraper, max_queries=100, max_books=300, warm_results=3):
+        self.scraper = scraper
+        self.max_queries = max_queries
+        self.max_books = max_books
+        self.warm_results = warm_results  # Detail pages fetched speculatively per query
+        self.query_cache = OrderedDict()  # Normalized query -> book URLs, LRU order
+        self.book_cache = OrderedDict()  # Book URL -> detailed book data, LRU order
+        self.cover_cache = OrderedDict()  # Image URL -> cover bytes, LRU order
+        self.inflight = {}  # Normalized query -> future of its prefetch
+        self.latest = None  # Only the newest typed query keeps fetching
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=2)
+
+    @staticmethod
+    def normalize(query):
+        return " ".join(query.lower().split())
+
+    def _remember(self, cache, key, value, limit):
+        with self.lock:
+            cache[key] = value
+            cache.move_to_end(key)
+            while len(cache) > limit:
+                cache.popitem(last=False)
+
+    def _lookup(self, cache, key):
+        with self.lock:
+            if key in cache:
+                cache.move_to_end(key)
+                return cache[key]
+        return None
+
+    def past_queries(self, prefix, limit=5):
+        """Recent memoized queries starting with prefix, newest first"""
+        prefix = self.normalize(prefix)
+        with self.lock:
+            matches = [query for query in reversed(self.query_cache) if query.startswith(prefix)]
+        return matches[:limit]
+
+    def cached_results(self, query):
+        """Full results for query if every detail page is cached, else None"""
+        urls = self._lookup(self.query_cache, self.normalize(query))
+        if urls is None:
+            return None
+        books = [self._lookup(self.book_cache, url) for url in urls]
+        if any(book is None for book in books):
+            return None
+        return [dict(book) for book in books]  # Callers may modify their copy
+
+    def cover(self, image_url):
+        """Cached cover bytes for a result, or None"""
+        return self._lookup(self.cover_cache, image_url) if image_url else None
+
+    def fetch_cover(self, image_url):
+        """Download a cover into the cache, returns its bytes or None on failure"""
+        if not image_url or image_url == 'None':
+            return None
+        cached = self.cover(image_url)
+        if cached is not None:
+            return cached
+        try:
+            response = self.scraper._get(image_url)
+            response.raise_for_status()
+        except Exception as e:
+            logger.debug("Cover prefetch failed for %s: %s", image_url, e)
+            return None
+        self._remember(self.cover_cache, image_url, response.content, self.max_books)
+        return response.content
+
+    def prefetch(self, query):
+        """Start fetching query in the background, abandoning older prefetches"""
+        key = self.normalize(query)
+        if not key:
+            return
+        self.latest = key
+        with self.lock:
+            if key in self.inflight:
+                return
+        if self.cached_results(key) is not None:
+            return
+        future = self.executor.submit(self._fetch, key, lambda: self.latest != key, self.warm_results)
+        with self.lock:
+            self.inflight[key] = future
+        future.add_done_callback(lambda _: self._finish(key))
+
+    def _finish(self, key):
+        with self.lock:
+            self.inflight.pop(key, None)
+
+    def _fetch(self, key, cancelled, detail_limit=None):
+        """Fetch search page then up to detail_limit detail pages, stopping once cancelled"""
+        if cancelled():
+            return None
+        urls = self._lookup(self.query_cache, key)
+        if urls is None:
+            urls = self.scraper.search_book_urls(key)
+            self._remember(self.query_cache, key, urls, self.max_queries)
+
+        for book_url in urls[:detail_limit]:
+            if cancelled():
+                logger.debug("Prefetch cancelled", extra={'query': key})
+                return None
+            book = self._lookup(self.book_cache, book_url)
+            if book is None:
+                sleep(self.scraper.request_delay)  # Respectful delay between requests
+                book = self.scraper._get_detailed_book_data(book_url)
+                if book:
+                    book['Goodreads_URL'] = book_url
+                    self._remember(self.book_cache, book_url, book, self.max_books)
+            if book and not cancelled():  # Result tiles render the cover from the cache
+                self.fetch_cover(book.get('Image_URL'))
+        return urls
+
+    def search(self, query):
+        """Blocking search that reuses prefetched pages, same results as search_books"""
+        key = self.normalize(query)
+        cached = self.cached_results(key)
+        if cached is not None:
+            logger.debug("Search served from prefetch", extra={'query': key})
+            return cached
+
+        with self.lock:
+            future = self.inflight.get(key)
+        if future is not None:  # Let the running prefetch finish instead of starting over
+            try:
+                future.result()
+            except Exception:
+                pass
+
+        try:
+            self.latest = key
+            self._fetch(key, lambda: False)
+        except GoodreadsScraperError:
+            raise
+        except requests.RequestException as e:
+            raise GoodreadsScraperError(f"Network error: {str(e)}")
+        except Exception as e:
+            raise GoodreadsScraperError(f"Scraping error: {str(e)}")
+
+        urls = self._lookup(self.query_cache, key) or []
+        books = [self._lookup(self.book_cache, url) for url in urls]
+        return [dict(book) for book in books if book]
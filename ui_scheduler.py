@@ -0,0 +1,87 @@
+import heapq
+import itertools
+import logging
+import time
+
+import instrumentation
+
+logger = logging.getLogger(__name__)
+
+INTERACTIVE = 0  # Hover and input feedback
+VISIBLE = 1      # Work the user can currently see
+BACKGROUND = 2   # Off-screen tiles, prefetching
+
+class UIScheduler:
+    """Cooperative scheduler running queued GUI work inside a per-frame budget.
+
+    All methods must be called from the Tk thread. One after() timer
+    drives the queue, so bulk work never starves input or redraws.
+    """
+    def __init__(self, window, frame_budget_ms=10, frame_interval_ms=16):
+        self.window = window
+        self.frame_budget = frame_budget_ms / 1000.0
+        self.frame_interval = frame_interval_ms
+        self.queue = []  # Heap of (priority, sequence, task)
+        self.counter = itertools.count()
+        self.coalesced = {}  # Key -> pending task, newest callback wins
+        self.timer = None
+
+    def submit(self, callback, priority=BACKGROUND, owner=None):
+        """Queue callback and return a task that can be passed to cancel()"""
+        task = [callback, owner, False]  # Callback, owner, cancelled
+        heapq.heappush(self.queue, (priority, next(self.counter), task))
+        self._wake()
+        return task
+
+    def coalesce(self, key, callback, priority=INTERACTIVE, owner=None):
+        """Run only the latest callback submitted under key before the next frame"""
+        pending = self.coalesced.get(key)
+        if pending is not None and not pending[2]:
+            pending[0] = callback  # Replace, keep its place in the queue
+            return pending
+        task = self.submit(callback, priority, owner)
+        self.coalesced[key] = task
+        return task
+
+    def cancel(self, task):
+        task[2] = True
+
+    def cancel_owner(self, owner):
+        """Drop every pending task belonging to a view being torn down"""
+        for _, _, task in self.queue:
+            if task[1] == owner:
+                task[2] = True
+
+    def pending(self, owner=None):
+        """Number of live tasks, optionally only those of owner"""
+        return sum(1 for _, _, task in self.queue
+                   if not task[2] and (owner is None or task[1] == owner))
+
+    def _wake(self):
+        if self.timer is None:
+            self.timer = self.window.after(1, self._run_frame)
+
+    def _run_frame(self):
+        """Run queued tasks, highest priority first, until the budget is used"""
+        self.timer = None
+        start = time.perf_counter()
+        while self.queue:
+            _, _, task = heapq.heappop(self.queue)
+            if task[2]:
+                continue
+            task[2] = True  # Mark done so coalesce() queues a fresh task
+            try:
+                task[0]()
+            except Exception as e:
+                logger.exception("Error in scheduled task: %s", e)
+            if time.perf_counter() - start >= self.frame_budget:
+                break
+        elapsed = time.perf_counter() - start
+        if instrumentation.is_enabled():
+            instrumentation.record('ui.frame_work', elapsed)
+
+        if self.queue:  # Leave the rest of the frame to Tk for input and redraw
+            delay = max(1, int(self.frame_interval - elapsed * 1000))
+            self.timer = self.window.after(delay, self._run_frame)
+        else:
+            self.coalesced.clear()
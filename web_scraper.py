@@ -4,46 +4,87 @@ import csv
 import os
 from time import sleep
 import re
+import threading
+import time
+import logging
+from instrumentation import span, timed
+
+logger = logging.getLogger(__name__)
 
 class GoodreadsScraperError(Exception):
     """Custom exception for scraper errors"""
     pass
 
+RETRY_STATUSES = (429, 500, 502, 503, 504)  # Responses worth trying again
+
+class RateBudget:
+    """Token bucket shared by every thread sending requests through it"""
+    def __init__(self, requests_per_minute=20, burst=2):
+        self.rate = requests_per_minute / 60.0
+        self.capacity = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, stop_event=None):
+        """Block until a request may be sent, False if stopped while waiting"""
+        stop_event = stop_event or threading.Event()
+        while not stop_event.is_set():
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return True
+                wait = (1 - self.tokens) / self.rate
+            stop_event.wait(wait)
+        return False
+
 class GoodreadsScraper:
-    def __init__(self):
-        self.base_url = "https://www.goodreads.com"
+    def __init__(self, base_url="https://www.goodreads.com", request_delay=1, max_retries=2, rate_budget=None):
+        self.base_url = base_url
+        self.rate_budget = rate_budget  # Optional RateBudget covering every request this scraper sends
+        self.request_delay = request_delay  # Seconds between detail page requests
+        self.max_retries = max_retries
+        self.retries = 0  # Number of retried requests, for diagnostics
+        self.retries_lock = threading.Lock()
         self.headers = {  # Browser headers for requests
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         }
 
+    def _get(self, url, headers=None, timeout=10, stop_event=None):
+        """GET a page, retrying rate limited and server error responses.
+
+        Setting stop_event cuts short waits for the rate budget and retries.
+        """
+        stop_event = stop_event or threading.Event()
+        for attempt in range(self.max_retries + 1):
+            if self.rate_budget and not self.rate_budget.acquire(stop_event):
+                raise GoodreadsScraperError("Request cancelled")
+            with span('network.fetch'):
+                response = requests.get(url, headers=headers or self.headers, timeout=timeout)
+            if response.status_code not in RETRY_STATUSES or attempt == self.max_retries:
+                return response
+            
+            with self.retries_lock:
+                self.retries += 1
+            retry_after = response.headers.get('Retry-After', '')
+            delay = float(retry_after) if retry_after.isdigit() else 2 ** attempt  # Honor server hint
+            logger.debug("Retrying request", extra={'url': url, 'status': response.status_code, 'delay': delay})
+            if stop_event.wait(min(delay, 30)):  # Stopped while backing off
+                return response
+
     def search_books(self, query):
         """Search for books and return results"""
         try:
-            search_url = f"{self.base_url}/search?q={query.replace(' ', '+')}"  # Add timeout to requests
-            response = requests.get(search_url, headers=self.headers, timeout=5)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.text, 'html.parser')
-            search_results = soup.select('tr[itemtype="http://schema.org/Book"]')[:3]
-            
-            if not search_results:
-                raise GoodreadsScraperError(f"No results found for '{query}'")
-            
             detailed_results = []  # Get detailed info for each result
-            for result in search_results:
-                book_link = result.select_one('a.bookTitle')  # Get book URL
-                if book_link and 'href' in book_link.attrs:
-                    book_url = book_link['href']
-                    if not book_url.startswith('http'):
-                        book_url = f"https://www.goodreads.com{book_url}"
-                    
-                    print(f"Debug - Found book URL: {book_url}")  # Debug print
-                    
-                    sleep(1)  # Respectful delay between requests
-                    detailed_data = self._get_detailed_book_data(book_url)
-                    if detailed_data:
-                        detailed_data['Goodreads_URL'] = book_url
-                        detailed_results.append(detailed_data)
+            for book_url in self.search_book_urls(query):
+                sleep(self.request_delay)  # Respectful delay between requests
+                detailed_data = self._get_detailed_book_data(book_url)
+                if detailed_data:
+                    detailed_data['Goodreads_URL'] = book_url
+                    detailed_results.append(detailed_data)
             
             return detailed_results
             
@@ -52,63 +93,125 @@ class GoodreadsScraper:
         except Exception as e:
             raise GoodreadsScraperError(f"Scraping error: {str(e)}")
 
+    def search_book_urls(self, query, limit=3):
+        """Fetch the search page and return the book URLs of the top results"""
+        search_url = f"{self.base_url}/search?q={query.replace(' ', '+')}"  # Add timeout to requests
+        response = self._get(search_url, timeout=5)
+        response.raise_for_status()
+        
+        with span('parse.search_html'):
+            soup = BeautifulSoup(response.text, 'html.parser')
+        search_results = soup.select('tr[itemtype="http://schema.org/Book"]')[:limit]
+        
+        if not search_results:
+            raise GoodreadsScraperError(f"No results found for '{query}'")
+        
+        book_urls = []
+        for result in search_results:
+            book_link = result.select_one('a.bookTitle')  # Get book URL
+            if book_link and 'href' in book_link.attrs:
+                book_url = book_link['href']
+                if not book_url.startswith('http'):
+                    book_url = f"{self.base_url}{book_url}"
+                
+                logger.debug("Found book URL", extra={'url': book_url})
+                book_urls.append(book_url)
+        return book_urls
+
     def _get_detailed_book_data(self, book_url):
         """Scrape detailed book information from book's page"""
         try:
-            print(f"Debug - Fetching details from: {book_url}")  # Debug print
-            response = requests.get(book_url, headers=self.headers)  # Get page data
+            logger.debug("Fetching details", extra={'url': book_url})
+            response = self._get(book_url)  # Get page data
             response.raise_for_status()
-            soup = BeautifulSoup(response.text, 'html.parser')
+            with span('parse.book_html'):
+                soup = BeautifulSoup(response.text, 'html.parser')
             
-            genres = self._get_detailed_genres(soup)  # Get genres first
+            book_data = self._parse_book_page(soup, book_url)
             
-            book_data = {  # Compile all book data
-                'Title': self._get_detailed_title(soup),
-                'Author': self._get_detailed_author(soup),
-                'Year': self._get_detailed_year(soup),
-                'Pages': self._get_detailed_pages(soup),
-                'Rating': self._get_detailed_rating(soup),
-                'Genre1': genres[0],
-                'Genre2': genres[1],
-                'Genre3': genres[2],
-                'Genre4': genres[3],
-                'Description': self._get_detailed_description(soup),
-                'Image_URL': self._get_detailed_image(soup),
-                'Goodreads_URL': book_url  # Use the original URL
-            }
-            
-            print(f"Debug - Book data URL: {book_data['Goodreads_URL']}")  # Debug print
+            logger.debug("Parsed book page", extra={'url': book_data['Goodreads_URL']})
             return book_data
             
         except Exception as e:
-            print(f"Error getting details for {book_url}: {str(e)}")
+            logger.error("Error getting details for %s: %s", book_url, e)
             return None
 
+    def fetch_book_update(self, book_url, etag=None, last_modified=None, stop_event=None):
+        """Conditionally re-fetch a book page.
+
+        Returns (book_data, validators). book_data is None when the server
+        answers 304 Not Modified; validators holds the ETag and
+        Last-Modified headers to send next time.
+        """
+        headers = dict(self.headers)
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+        
+        response = self._get(book_url, headers=headers, stop_event=stop_event)
+        validators = {
+            'etag': response.headers.get('ETag', etag),
+            'last_modified': response.headers.get('Last-Modified', last_modified)
+        }
+        if response.status_code == 304:  # Page unchanged since last fetch
+            return None, validators
+        response.raise_for_status()
+        
+        with span('parse.book_html'):
+            soup = BeautifulSoup(response.text, 'html.parser')
+        return self._parse_book_page(soup, book_url), validators
+
+    @timed('extract.all_fields')
+    def _parse_book_page(self, soup, book_url):
+        """Extract all book fields from a parsed book page"""
+        genres = self._get_detailed_genres(soup)  # Get genres first
+        
+        return {  # Compile all book data
+            'Title': self._get_detailed_title(soup),
+            'Author': self._get_detailed_author(soup),
+            'Year': self._get_detailed_year(soup),
+            'Pages': self._get_detailed_pages(soup),
+            'Rating': self._get_detailed_rating(soup),
+            'Genre1': genres[0],
+            'Genre2': genres[1],
+            'Genre3': genres[2],
+            'Genre4': genres[3],
+            'Description': self._get_detailed_description(soup),
+            'Image_URL': self._get_detailed_image(soup),
+            'Goodreads_URL': book_url  # Use the original URL
+        }
+
+    @timed('extract.title')
     def _get_detailed_title(self, soup):
         """Get title from book page"""
         title_elem = soup.select_one('h1.Text__title1')  # Current title structure
         return title_elem.text.strip() if title_elem else "Unknown Title"
 
+    @timed('extract.author')
     def _get_detailed_author(self, soup):
         """Get author from book page"""
         author_elem = soup.select_one('span.ContributorLink__name')  # Current author structure
         return author_elem.text.strip() if author_elem else "Unknown Author"
 
+    @timed('extract.year')
     def _get_detailed_year(self, soup):
         """Get publication year from book page"""
         all_text = soup.text  # Look for "First published" text
         match = re.search(r'First published.*?(\d{4})', all_text)
         if match:
             year = int(match.group(1))
-            print(f"Debug - Found year: {year} from text: {match.group(0)}")  # Show full match vs captured year
+            logger.debug("Found year", extra={'year': year, 'match': match.group(0)})  # Show full match vs captured year
             if 1000 <= year <= 9999:  # Sanity check
                 return year
         
-        print("Debug - Publication text found:",  # Print debug info
-              [text for text in all_text.split('\n') if 'published' in text.lower()])
+        if logger.isEnabledFor(logging.DEBUG):  # Avoid scanning the page text unless needed
+            logger.debug("No year found", extra={
+                'published_text': [text for text in all_text.split('\n') if 'published' in text.lower()]})
         
         return 0
 
+    @timed('extract.pages')
     def _get_detailed_pages(self, soup):
         """Get page count from book page"""
         details = soup.select_one('div.FeaturedDetails')  # Current page count location
@@ -116,24 +219,26 @@ class GoodreadsScraper:
             pages_text = details.text
             match = re.search(r'(\d+) pages', pages_text)
             if match:
-                print(f"Debug - Found pages: {match.group(1)}")  # Debug print
+                logger.debug("Found pages", extra={'pages': match.group(1)})
                 return int(match.group(1))
-        print("Debug - No page count found")  # Debug print
+        logger.debug("No page count found")
         return 0
 
+    @timed('extract.rating')
     def _get_detailed_rating(self, soup):
         """Get rating from book page"""
         rating_elem = soup.select_one('div.RatingStatistics__rating')  # Current rating structure
         if rating_elem:
             try:
-                print(f"Debug - Found rating: {rating_elem.text.strip()}")  # Debug print
+                logger.debug("Found rating", extra={'rating': rating_elem.text.strip()})
                 return float(rating_elem.text.strip())
             except ValueError:
-                print("Debug - Invalid rating format")  # Debug print
+                logger.debug("Invalid rating format")
                 return 0.0
-        print("Debug - No rating found")  # Debug print
+        logger.debug("No rating found")
         return 0.0
 
+    @timed('extract.genres')
     def _get_detailed_genres(self, soup):
         """Get up to 4 genres from book page"""
         genres = set()  # Use set to avoid duplicates
@@ -157,6 +262,7 @@ class GoodreadsScraper:
         
         return genre_list
 
+    @timed('extract.description')
     def _get_detailed_description(self, soup):
         """Get book description from book page"""
         desc_elem = soup.select_one('div.DetailsLayoutRightParagraph__widthConstrained')  # Current description location
@@ -164,6 +270,7 @@ class GoodreadsScraper:
             desc_elem = soup.select_one('div.TruncatedContent__text--large')  # Alternate description location
         return desc_elem.text.strip() if desc_elem else "No description available"
 
+    @timed('extract.image')
     def _get_detailed_image(self, soup):
         """Get book cover image URL from book page"""
         img_container = soup.select_one('div.BookCover__image img')  # Current image container
@@ -172,8 +279,8 @@ class GoodreadsScraper:
             return url.replace('._SY475_', '._SX1200_')  # Convert to high-res version
         return None
 
-def save_image(url, book_title, image_folder="book_covers"):
-    """Save book cover image to local folder"""
+def save_image(url, book_title, image_folder="book_covers", scraper=None):
+    """Save book cover image to local folder, retrying through scraper's _get"""
     if not url:
         return None
     
@@ -185,11 +292,12 @@ def save_image(url, book_title, image_folder="book_covers"):
     filepath = os.path.join(image_folder, filename)
     
     try:
-        response = requests.get(url)
+        with span('network.image'):
+            response = (scraper or GoodreadsScraper())._get(url, timeout=15)
         response.raise_for_status()
         with open(filepath, 'wb') as f:
             f.write(response.content)
         return filepath
     except Exception as e:
-        print(f"Error saving image for {book_title}: {str(e)}")
+        logger.error("Error saving image for %s: %s", book_title, e)
         return None
\ No newline at end of file